@@ -24,6 +24,11 @@ os.makedirs(TMP_DATA_DIR, exist_ok=True)
 
 DEBUG_MODE: bool = settings.DEBUG
 
+# Сколько раз прогресс бар перерисовывается за один проход (не на каждой
+# итерации, иначе вывод в терминал занимает больше времени, чем сама работа):
+PROGRESS_BAR_MAX_UPDATES = 200
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*m')
+
 DEFAULT_LOG_FILE = os.path.join(LOG_DIR, 'log.log')
 DEFAULT_ROTATING_LOG_FILE = os.path.join(LOG_DIR, 'default', 'log.log')
 DEFAULT_LOG_MODE = 4 if DEBUG_MODE else 1
@@ -104,6 +109,8 @@ MAX_EMAIL_ID_LEN = 256
 
 PUBLIC_SUBFOLDER_NAME = 'public'
 SUBFOLDER_DATE_FORMAT = '%Y-%m-%d'
+# Имя папки-даты в формате SUBFOLDER_DATE_FORMAT (меняются вместе):
+SUBFOLDER_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
 SUBFOLDER_EMAIL_NAME = 'emails_attachments'
 SUBFOLDER_MIME_EMAIL_NAME = 'emails_mimes'
 # Модель Attachment настроена на папку settings.MEDIA_ROOT:
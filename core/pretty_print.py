@@ -1,11 +1,12 @@
-import re
 import shutil
 from datetime import datetime
 from typing import Optional
 
 from colorama import Back, Fore, Style
 
+from .constants import ANSI_ESCAPE_RE
 from .constants import DEBUG_MODE as DEBUG
+from .constants import PROGRESS_BAR_MAX_UPDATES
 
 
 class PrettyPrint:
@@ -106,8 +107,7 @@ class PrettyPrint:
     @staticmethod
     def _strip_ansi(text: str) -> str:
         """Удаляет ANSI-коды из строки для корректного измерения длины."""
-        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-        return ansi_escape.sub('', text)
+        return ANSI_ESCAPE_RE.sub('', text)
 
     @staticmethod
     def _get_bg_color(
@@ -132,6 +132,12 @@ class PrettyPrint:
             return
 
         iteration = min(iteration + 1, total)
+
+        # Перерисовываем не чаще PROGRESS_BAR_MAX_UPDATES раз за проход:
+        step = max(1, total // PROGRESS_BAR_MAX_UPDATES)
+        if iteration % step and iteration != total:
+            return
+
         progress = iteration / total
         percent = progress * 100
         percent_text = f' {percent:5.1f}% ' if progress != 1 else (
@@ -1,7 +1,7 @@
 import multiprocessing
 import os
 from datetime import datetime, timedelta
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterator, Optional
 
 from django.http import HttpRequest
 from django.utils import timezone
@@ -172,6 +172,25 @@ def run_with_timeout_process(
         return return_dict.get('result')
 
 
+def scandir_recursive(path: str) -> Iterator[os.DirEntry]:
+    """
+    Рекурсивно обходит папку через os.scandir.
+
+    В отличие от Path.rglob тип записи берётся из DirEntry без лишних
+    системных вызовов, а результат DirEntry.stat() кэшируется. Подпапка
+    возвращается после своего содержимого, поэтому папки идут от самых
+    глубоких к верхним.
+    """
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from scandir_recursive(entry.path)
+                yield entry
+    except OSError:
+        default_logger.warning(f'Не удалось прочитать папку {path}')
+
+
 def sanitize_http_filename(filename: str) -> str:
     """
     Убираем CR/LF и управляющие символы из имени файла
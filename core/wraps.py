@@ -2,7 +2,6 @@ import functools
 import inspect
 import threading
 import time
-from datetime import datetime
 from http import HTTPStatus
 from logging import Logger
 from typing import Callable, Optional
@@ -24,12 +23,12 @@ def timer(logger: Logger, is_debug: bool = True) -> Callable:
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = datetime.now()
+            # monotonic не зависит от перевода системных часов (NTP):
+            start_time = time.monotonic()
             try:
                 return func(*args, **kwargs)
             finally:
-                execution_time = datetime.now() - start_time
-                total_seconds = execution_time.total_seconds()
+                total_seconds = time.monotonic() - start_time
                 msg = (
                     f'Время выполнения {func.__name__}: '
                     f'{format_seconds(total_seconds)}'
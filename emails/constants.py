@@ -12,11 +12,16 @@ MAX_EMAIL_LEN = 64
 MAX_DOWNLOAD_ATTACHMENT_SIZE = 100 * 1024 * 1024
 MAX_SEND_ATTACHMENT_SIZE = 50 * 1024 * 1024
 
+# Вложения в base64 декодируются в файл частями такого размера (символов):
+ATTACHMENT_DECODE_CHUNK_SIZE = 1024 * 1024
+
 # Кол-во дней через которое для не актуальных инцидентов будут удалены
 # вложения:
 MAX_EMAILS_ATTACHMENT_DAYS = 365
 
 EMAILS_FILES_2_DEL_BATCH_SIZE = 500
+# Сколько потоков одновременно удаляют файлы вложений:
+EMAILS_FILES_2_DEL_WORKERS = 16
 
 MAX_EMAILS_INFO_CACHE_SEC = 3600
 
@@ -129,6 +134,19 @@ EMAIL_RE = re.compile(
     re.IGNORECASE,
 )
 
+# Отдельный Message-ID в заголовках References / In-Reply-To (закрывающая
+# скобка может отсутствовать в битых заголовках):
+MSG_ID_RE = re.compile(r'<[^<>]+>?')
+
+# UID письма в строке ответа UID FETCH: b'12 (UID 345 RFC822 {2048}':
+FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+
+# Untagged ответ о новых письмах в папке: b'* 12 EXISTS\r\n':
+IMAP_EXISTS_RE = re.compile(rb'\* \d+ EXISTS\b')
+
+# Возможное начало JSON-объекта или массива в тексте письма:
+JSON_START_RE = re.compile(r'[{\[]')
+
 MIN_STACK_EMAILS_TTL = 120  # Не менять, сначала просмотеть задачу в Cellery
 
 MAX_STACK_EMAILS_TTL = 3600
@@ -156,5 +174,59 @@ EMAIL_PARSER_CONFIG = {
 
 Config.validate_env_variables(EMAIL_PARSER_CONFIG)
 
-EMAILD_UID_CACHE_PREFIX_KEY = 'imap_uid_map__'
+# Ключи кеша содержат IMAP UID (не порядковые номера писем) и имя папки:
+EMAILD_UID_CACHE_PREFIX_KEY = 'imap_uid_map_v2__'
 EMAILD_UID_CACHE_TTL = 3600 * 24 * 2
+
+# Мусорные значения In-Reply-To, при которых письмо считается первым:
+GARBAGE_IN_REPLY_TO_IDS = frozenset({'<null>', '<0>', '<none>'})
+
+# Сколько писем запрашивается одним FETCH (RFC822). Большие наборы ID
+# сервер отклоняет с "maximum request size exceeded":
+EMAIL_FETCH_CHUNK_SIZE = 100
+
+# Заголовки писем, специфичные для Yandex Tracker (в нижнем регистре):
+YANDEX_TRACKER_HEADERS = frozenset({
+    'x-yandex-tracker-mail-type',
+    'x-yandex-tracker-env',
+    'x-tracker-issue-key',
+    'x-tracker-comment-id',
+})
+
+# Сколько Message-ID объединяется через OR в одном IMAP SEARCH:
+EMAIL_SEARCH_BY_ID_CHUNK_SIZE = 50
+
+EMAIL_IMAP_CONN_TIMEOUT = 600
+# Через сколько секунд простоя IMAP соединение проверяется командой NOOP:
+EMAIL_IMAP_NOOP_INTERVAL = 300
+# Сколько секунд парсер ждёт новые письма командой IDLE до следующего
+# прогона. Прогон также повторно обрабатывает письма с ошибками, поэтому
+# ожидание намного короче предела IDLE из RFC 2177 (29 минут):
+EMAIL_IMAP_IDLE_TIMEOUT = 300
+# Тег команды IDLE. Не пересекается с тегами imaplib (четыре буквы и номер),
+# а других команд во время IDLE не бывает:
+EMAIL_IMAP_IDLE_TAG = b'DSPIDLE'
+# Пауза перед переподключением после таймаута или обрыва IMAP соединения
+# удваивается с каждой ошибкой подряд, от BASE до MAX секунд:
+EMAIL_IMAP_RECONNECT_BASE_DELAY = 1
+EMAIL_IMAP_RECONNECT_MAX_DELAY = 30
+# Пауза после прочих ошибок парсера растет так же, от
+# MIN_WAIT_SEC_WITH_CRITICAL_EXC до этого значения (сек):
+EMAIL_PARSER_CRITICAL_MAX_DELAY = 600
+# Случайная добавка к паузе (доля от паузы), чтобы процессы парсера не
+# переподключались к серверу одновременно:
+EMAIL_IMAP_RECONNECT_JITTER = 0.25
+
+# Сколько разобранных писем парсер записывает в БД одной пачкой:
+EMAIL_PARSER_BULK_SIZE = 100
+
+# Сколько писем запрашивается в одном FETCH только заголовка Message-ID:
+EMAIL_HEADERS_FETCH_CHUNK_SIZE = 500
+
+# С какого числа писем разбор выполняется в нескольких процессах:
+EMAIL_PARSER_PROCESS_MIN_COUNT = 200
+# Сколько писем передаётся процессу-обработчику за одну задачу:
+EMAIL_PARSER_PROCESS_CHUNK_SIZE = 16
+
+# Сколько нормализованных Message-ID хранится в кэше prepare_msg_id:
+MSG_ID_CACHE_SIZE = 8192
@@ -1,13 +1,19 @@
-import email
 import hashlib
 import imaplib
 import json
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, time, timedelta
 from email import header, message
+from email.parser import BytesHeaderParser, BytesParser
+from email.policy import compat32
 from imaplib import IMAP4
-from typing import Any, Optional, Union
-from zoneinfo import ZoneInfo
+from io import BytesIO
+from logging.handlers import QueueListener
+from time import monotonic
+from typing import Any, Iterable, Iterator, Optional, Union
 
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
@@ -22,9 +28,24 @@ from core.loggers import email_parser_logger
 from core.pretty_print import PrettyPrint
 from core.wraps import min_wait_timer, timer
 from emails.constants import (
+    EMAIL_FETCH_CHUNK_SIZE,
+    EMAIL_HEADERS_FETCH_CHUNK_SIZE,
+    EMAIL_IMAP_CONN_TIMEOUT,
+    EMAIL_IMAP_IDLE_TAG,
+    EMAIL_IMAP_IDLE_TIMEOUT,
+    EMAIL_IMAP_NOOP_INTERVAL,
+    EMAIL_PARSER_BULK_SIZE,
     EMAIL_PARSER_CONFIG,
+    EMAIL_PARSER_PROCESS_CHUNK_SIZE,
+    EMAIL_PARSER_PROCESS_MIN_COUNT,
+    EMAIL_SEARCH_BY_ID_CHUNK_SIZE,
     EMAILD_UID_CACHE_PREFIX_KEY,
     EMAILD_UID_CACHE_TTL,
+    FETCH_UID_RE,
+    GARBAGE_IN_REPLY_TO_IDS,
+    IMAP_EXISTS_RE,
+    MSG_ID_RE,
+    YANDEX_TRACKER_HEADERS,
 )
 from emails.models import EmailErr, EmailFolder, EmailMessage, EmailMime
 from emails.services.turn_off_incident_auto_close import (
@@ -34,6 +55,7 @@ from incidents.utils import IncidentManager
 from yandex_tracker.exceptions import YandexTrackerAuthErr
 from yandex_tracker.utils import YandexTrackerManager, yt_manager
 
+from .parse_worker import ParentLogHandler, init_worker, parse_email
 from .utils import EmailManager
 from .validators import EmailValidator
 
@@ -41,6 +63,11 @@ from .validators import EmailValidator
 class EmailParser(EmailValidator, EmailManager, IncidentManager):
 
     inbox_folder_name = 'INBOX'
+    # compat32 — политика по умолчанию, указана явно: policy.default
+    # заметно медленнее из-за разбора и перефолдинга заголовков, а код
+    # парсера рассчитан на строковые заголовки compat32.
+    header_parser = BytesHeaderParser(policy=compat32)
+    msg_parser = BytesParser(policy=compat32)
 
     def __init__(
         self,
@@ -57,13 +84,189 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
         self.email_port = int(email_port)
 
         self.yt_manager = yt_manager
+        self.yt_issue_key_re: Optional[re.Pattern] = (
+            re.compile(rf'{re.escape(yt_manager.queue)}-\d+')
+            if yt_manager else None
+        )
 
         self.sent_folder_name = sent_folder_name
 
-    @timer(email_parser_logger)
-    def _find_emails_by_date(
-        self, today: datetime, check_days: int, mail: imaplib.IMAP4_SSL
-    ) -> list[bytes]:
+        self._mail: Optional[imaplib.IMAP4_SSL] = None
+        self._mail_mailbox: Optional[str] = None
+        self._mail_used_at = 0.0
+
+    def _create_mail_connection(self, mailbox: str) -> imaplib.IMAP4_SSL:
+        """Создает новое соединение, логинится и выбирает папку."""
+        mail = None
+        try:
+            mail = imaplib.IMAP4_SSL(
+                self.email_server,
+                self.email_port,
+                timeout=EMAIL_IMAP_CONN_TIMEOUT,
+            )
+            mail.login(self.email_login, self.email_pswd)
+            mail.select(mailbox, readonly=True)
+
+            email_parser_logger.debug(
+                f'Успешное подключение к папке {mailbox}'
+            )
+            return mail
+        except Exception as e:
+            email_parser_logger.error(f'Ошибка при создании соединения: {e}')
+            if mail:
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
+            raise
+
+    def get_mail(self, mailbox: str = inbox_folder_name) -> imaplib.IMAP4_SSL:
+        """
+        Возвращает живое IMAP соединение с выбранной папкой.
+
+        Соединение переиспользуется между запусками парсера: TLS и LOGIN
+        выполняются только при первом обращении или после разрыва. Если
+        соединение простаивало дольше EMAIL_IMAP_NOOP_INTERVAL, его
+        работоспособность проверяется командой NOOP.
+        """
+        mail = self._mail
+
+        if mail is not None and self._mail_mailbox == mailbox:
+            if monotonic() - self._mail_used_at < EMAIL_IMAP_NOOP_INTERVAL:
+                self._mail_used_at = monotonic()
+                return mail
+
+            try:
+                mail.noop()
+                self._mail_used_at = monotonic()
+                return mail
+            except (
+                imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError
+            ) as e:
+                email_parser_logger.warning(
+                    f'IMAP соединение потеряно, переподключаемся: {e}'
+                )
+
+        self.close_mail()
+
+        self._mail = self._create_mail_connection(mailbox)
+        self._mail_mailbox = mailbox
+        self._mail_used_at = monotonic()
+
+        return self._mail
+
+    def wait_new_emails(
+        self,
+        mail: imaplib.IMAP4_SSL,
+        timeout: float = EMAIL_IMAP_IDLE_TIMEOUT,
+    ) -> bool:
+        """
+        Ждёт новые письма в выбранной папке командой IDLE (RFC 2177): сервер
+        сам сообщает о них (EXISTS), и папку не нужно повторно опрашивать
+        SEARCH, пока в ней ничего не происходит.
+
+        IMAP4.idle() появился в imaplib только в Python 3.14, поэтому
+        команда отправляется через публичные send() и readline(). Ответы
+        читаются построчно из буфера imaplib с таймаутом сокета: select по
+        сокету не видит строки, уже прочитанные в этот буфер.
+
+        Если сервер не поддерживает IDLE, возвращается сразу.
+
+        Returns:
+            bool: True, если за время ожидания пришли новые письма
+        """
+        if 'IDLE' not in mail.capabilities:
+            return False
+
+        sock = mail.socket()
+        conn_timeout = sock.gettimeout()
+        deadline = monotonic() + timeout
+        has_new_emails = False
+
+        mail.send(EMAIL_IMAP_IDLE_TAG + b' IDLE' + imaplib.CRLF)
+
+        # До ответа "+ idling" сервер может прислать untagged ответы:
+        while True:
+            line = self._read_idle_line(mail)
+
+            if line.startswith(b'+'):
+                break
+            if line.startswith(EMAIL_IMAP_IDLE_TAG + b' '):
+                raise imaplib.IMAP4.error(f'IDLE: {line!r}')
+
+            has_new_emails |= self._is_idle_exists(line)
+
+        # Пока в папке ничего не происходит, сервер молчит или присылает
+        # служебные ответы (например, "* OK Still here"):
+        while (
+            not has_new_emails
+            and (remaining := deadline - monotonic()) > 0
+        ):
+            sock.settimeout(remaining)
+
+            try:
+                line = self._read_idle_line(mail)
+            except TimeoutError:
+                # После таймаута файл сокета больше не читается, поэтому он
+                # создаётся заново, как в IMAP4.open(). Буфер пуст: сервер
+                # ничего не прислал.
+                mail.file.close()
+                mail.file = sock.makefile('rb')
+                break
+            finally:
+                sock.settimeout(conn_timeout)
+
+            has_new_emails = self._is_idle_exists(line)
+
+        mail.send(b'DONE' + imaplib.CRLF)
+
+        while True:
+            line = self._read_idle_line(mail)
+
+            if line.startswith(EMAIL_IMAP_IDLE_TAG + b' '):
+                if not line.startswith(EMAIL_IMAP_IDLE_TAG + b' OK'):
+                    raise imaplib.IMAP4.error(f'IDLE: {line!r}')
+                break
+
+            has_new_emails |= self._is_idle_exists(line)
+
+        self._mail_used_at = monotonic()
+
+        return has_new_emails
+
+    @staticmethod
+    def _read_idle_line(mail: imaplib.IMAP4_SSL) -> bytes:
+        """Строка ответа сервера во время IDLE."""
+        line = mail.readline()
+
+        if not line:
+            raise imaplib.IMAP4.abort('IDLE: соединение закрыто сервером')
+
+        return line
+
+    @staticmethod
+    def _is_idle_exists(line: bytes) -> bool:
+        """Ответ вида "* 12 EXISTS": в папке появились письма."""
+        return bool(IMAP_EXISTS_RE.match(line))
+
+    def close_mail(self):
+        """Закрывает сохраненное IMAP соединение, если оно есть."""
+        mail, self._mail, self._mail_mailbox = self._mail, None, None
+
+        if mail is None:
+            return
+
+        try:
+            mail.close()
+            mail.logout()
+        except Exception:
+            pass
+
+    def _date_search_query(self, today: datetime, check_days: int) -> str:
+        """
+        Условие SEARCH по дате. Время суток берётся из переданного today
+        (в TIME_ZONE проекта), а не повторным чтением часов.
+        """
         start_date = today - timedelta(days=check_days)
         end_date = today + timedelta(days=1)
 
@@ -73,98 +276,134 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
         if self.is_time_in_range(
             start=time(0, 0),
             end=time(3, 0),
-            check_time=datetime.now(ZoneInfo('Europe/Moscow')).time()
+            check_time=timezone.localtime(today).time()
         ):
-            search_query = f'(SINCE {date_since})'
-        else:
-            search_query = f'(SINCE {date_since} BEFORE {date_before})'
+            return f'SINCE "{date_since}"'
+
+        return f'SINCE "{date_since}" BEFORE "{date_before}"'
 
-        status, messages = mail.search(None, search_query)
+    @staticmethod
+    def _imap_quote(value: str) -> str:
+        """
+        Quoted string по RFC 3501. Без экранирования одна кавычка в
+        Message-ID ломала бы весь OR-запрос со всем чанком ID.
+        """
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
 
-        if status != 'OK' or not messages[0]:
-            return []
+    @staticmethod
+    def _imap_uid_set(uids: list[str]) -> str:
+        """
+        Набор UID для команды (RFC 3501, sequence-set): подряд идущие UID
+        сжимаются в диапазон a:b, поэтому команда короче и сервер не
+        разбирает сотни отдельных номеров: ['1', '2', '3', '7'] -> '1:3,7'.
+        """
+        parts: list[str] = []
+        numbers = sorted(map(int, uids))
+        i = 0
+
+        while i < len(numbers):
+            start = end = numbers[i]
+            i += 1
+            while i < len(numbers) and numbers[i] == end + 1:
+                end = numbers[i]
+                i += 1
+            parts.append(str(start) if start == end else f'{start}:{end}')
+
+        return ','.join(parts)
+
+    def _msg_id_search_queries(
+        self, message_ids: frozenset[str], today: datetime, check_days: int
+    ) -> list[str]:
+        """
+        Один SEARCH вида OR OR A B C на чанк Message-ID вместо запроса на
+        каждый ID.
+        """
+        date_query = self._date_search_query(today, check_days)
+        message_ids = list(message_ids)
+        queries = []
+
+        for i in range(0, len(message_ids), EMAIL_SEARCH_BY_ID_CHUNK_SIZE):
+            chunk = message_ids[i:i + EMAIL_SEARCH_BY_ID_CHUNK_SIZE]
+            ids_query = ' '.join(
+                ['OR'] * (len(chunk) - 1)
+                + [
+                    f'HEADER Message-ID {self._imap_quote(message_id)}'
+                    for message_id in chunk
+                ]
+            )
+            queries.append(f'({ids_query}) {date_query}')
 
-        return messages[0].split()
+        return queries
 
     @timer(email_parser_logger)
-    def _find_email_by_id(
+    def _search_emails(
         self,
-        message_ids: set[str],
         mail: imaplib.IMAP4_SSL,
         today: datetime,
-        check_days: int
+        check_days: int,
+        err_msg_ids: frozenset[str],
+        check_err_days: int,
     ) -> list[bytes]:
-        start_date = today - timedelta(days=check_days)
-        end_date = today + timedelta(days=1)
-
-        date_since = start_date.strftime('%d-%b-%Y')
-        date_before = end_date.strftime('%d-%b-%Y')
-
-        found_email_ids = []
-        total = len(message_ids)
-
-        for index, message_id in enumerate(message_ids):
-            PrettyPrint.progress_bar_error(
-                index, total, 'Поиск писем из EmailErr:')
-
-            if self.is_time_in_range(
-                start=time(0, 0),
-                end=time(3, 0),
-                check_time=datetime.now(ZoneInfo('Europe/Moscow')).time()
-            ):
-                search_query = (
-                    f'HEADER Message-ID "{message_id}" '
-                    f'SINCE "{date_since}"'
-                )
-            else:
-                search_query = (
-                    f'HEADER Message-ID "{message_id}" '
-                    f'SINCE "{date_since}" BEFORE "{date_before}"'
-                )
-
-            status, messages = mail.search(None, search_query)
-
-            if status == 'OK':
-                email_ids = messages[0].split()
-                filtered_ids = [
-                    email_id for email_id in email_ids if email_id != b''
-                ]
+        """
+        Ищет новые письма за период и письма из EmailErr по Message-ID.
+        Все SEARCH выполняются подряд на одном соединении.
+        """
+        queries = [f'({self._date_search_query(today, check_days)})']
+        queries += self._msg_id_search_queries(
+            err_msg_ids, today, check_err_days
+        )
 
-                if filtered_ids:
-                    found_email_ids.extend(filtered_ids)
+        responses = self._uid_commands(
+            mail, 'SEARCH', [(query,) for query in queries]
+        )
 
-        return found_email_ids
+        return [
+            email_id for data in responses if data
+            for email_id in data.split()
+        ]
 
-    @staticmethod
-    def parse_all_json_from_text(text: str) -> tuple[list[dict], str]:
+    @classmethod
+    def parse_all_json_from_text(
+        cls, text: str, with_text: bool = True
+    ) -> tuple[list[dict], str]:
         """
         Для сообщений отправленных из формы, надо найти json и из него выбрать
         email отправителя и получателей.
 
         Функция находит все JSON-блоки в тексте и возвращает список словарей и
         остальной текст.
+
+        Каждый кандидат, начинающийся с "{", разбирается JSONDecoder.raw_decode
+        целиком (в том числе с вложенными объектами), поэтому текст
+        просматривается за один проход без регулярных выражений. Остальной
+        текст собирается по границам найденных блоков одним join; при
+        with_text=False он не собирается вовсе и возвращается пустым.
         """
         json_blocks = []
-        remaining_text = text
-        pattern = re.compile(r'\{.*?\}', re.DOTALL)
-
-        while True:
-            match = pattern.search(remaining_text)
-            if not match:
-                break
+        text_parts = []
+        pos = 0
+        start = text.find('{')
 
-            candidate = match.group()
+        while start != -1:
             try:
-                json_dict = json.loads(candidate)
-                json_blocks.append(json_dict)
-                remaining_text = (
-                    remaining_text[:match.start()]
-                    + remaining_text[match.end():]
-                )
+                json_dict, end = cls.json_decoder.raw_decode(text, start)
             except json.JSONDecodeError:
-                remaining_text = remaining_text[match.end():]
+                start = text.find('{', start + 1)
+                continue
+
+            json_blocks.append(json_dict)
+            if with_text:
+                text_parts.append(text[pos:start])
+            pos = end
+            start = text.find('{', end)
+
+        if not with_text:
+            return json_blocks, ''
 
-        human_text = remaining_text.replace('\n\n', '\n').strip()
+        text_parts.append(text[pos:])
+
+        human_text = ''.join(text_parts).replace('\n\n', '\n').strip()
         return json_blocks, human_text
 
     @staticmethod
@@ -183,59 +422,50 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
         in_reply_to: Optional[str],
         references: Optional[list[str]],
         message_id: Optional[str] = None,
-        our_message_ids: Optional[set[str]] = None,
+        our_message_ids: Optional[frozenset[str]] = None,
     ) -> bool:
         """
         Определяет, является ли письмо первым для нас в цепочке.
 
         Args:
             in_reply_to: заголовок In-Reply-To
-            references: список References
+            references: список References (уже без пробелов по краям)
             message_id: текущий message-id письма
-            our_message_ids: set всех message_id, которые уже есть в нашей
-            системе
+            our_message_ids: frozenset message_id из References, которые уже
+            есть в нашей системе
         """
 
-        # Если нет цепочки ссылок:
-        if not in_reply_to and not references:
-            return True
-
-        # References пустой или None:
+        # Нет цепочки ссылок или References пустой:
         if not references:
             return True
 
-        # Если In-Reply-To указывает на самого себя:
-        if (
-            message_id
-            and in_reply_to
-            and in_reply_to.strip() == message_id.strip()
-        ):
-            return True
-
         # Если In-Reply-To auto-сгенерированный или пустой мусор:
-        if in_reply_to and (
-            in_reply_to.lower().startswith('<auto-')
-            or in_reply_to.lower() in {'<null>', '<0>', '<none>'}
-        ):
-            return True
+        if in_reply_to:
+            in_reply_to_lower = in_reply_to.lower()
+            if (
+                in_reply_to_lower in GARBAGE_IN_REPLY_TO_IDS
+                or in_reply_to_lower.startswith('<auto-')
+            ):
+                return True
 
-        # References состоит из одного элемента и он совпадает с message_id:
-        if (
-            message_id
-            and references
-            and len(references) == 1
-            and references[0].strip() == message_id.strip()
-        ):
-            return True
+        if message_id:
+            message_id = message_id.strip()
 
-        # Проверяем, есть ли References на письма нашей системы:
-        if our_message_ids and references:
-            for ref in references:
-                if ref.strip() in our_message_ids:
-                    return False  # Письмо является ответом на наше предыдущее
-            # Ни одна ссылка не принадлежит нашей системе, значит для нас оно
-            # первое:
-            return True
+            # Если In-Reply-To указывает на самого себя:
+            if in_reply_to and in_reply_to.strip() == message_id:
+                return True
+
+            # References состоит из одного элемента и он совпадает с
+            # message_id:
+            if len(references) == 1 and references[0] == message_id:
+                return True
+
+        # Проверяем, есть ли References на письма нашей системы (ссылки уже
+        # нормализованы при разборе заголовка):
+        if our_message_ids is not None:
+            # Если ни одна ссылка не принадлежит нашей системе, значит для
+            # нас оно первое:
+            return our_message_ids.isdisjoint(references)
 
         return False
 
@@ -248,118 +478,922 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
         Если письмо было отправленно из Yandex Tracker, надо
         убедиться что оно соответствует нашей очереди.
         """
-        result = False
+        # Без ключа очереди в теме письмо нам не подходит — проверка
+        # подстроки дешевле обхода заголовков и регулярного выражения:
+        if (
+            not self.yt_manager
+            or not subject
+            or self.yt_manager.queue not in subject
+        ):
+            return False
 
-        if not self.yt_manager or not subject:
-            return result
+        # isdisjoint прекращает обход заголовков на первом совпадении:
+        if YANDEX_TRACKER_HEADERS.isdisjoint(map(str.lower, msg.keys())):
+            return False
 
-        tracker_headers = [
-            'X-Yandex-Tracker-Mail-Type',
-            'X-Yandex-Tracker-Env',
-            'X-Tracker-Issue-Key',
-            'X-Tracker-Comment-Id'
-        ]
+        return bool(self.yt_issue_key_re.search(subject))
 
-        if any(header in msg for header in tracker_headers):
-            matches = re.findall(
-                rf'{self.yt_manager.queue}-\d+', subject
-            )
-            result = True if matches else False
+    def _uid_cache_key(self, msg_uid: str | int) -> str:
+        """Ключ кеша UID: UID уникальны только в пределах папки."""
+        return (
+            f'{EMAILD_UID_CACHE_PREFIX_KEY}{self._mail_mailbox}__{msg_uid}'
+        )
 
-        return result
+    @staticmethod
+    def _fetch_response_uid(fetch_header: bytes) -> Optional[str]:
+        """UID письма из строки ответа вида b'12 (UID 345 RFC822 {..}'."""
+        match = FETCH_UID_RE.search(fetch_header)
+        return match.group(1).decode() if match else None
 
     def _save_uid_2_cache(self, msg_uid: str | int, email_msg_id: str):
         """Кеш для будущей ускоренной фильтрации на сервере IMAP."""
-        email_cache_key = f'{EMAILD_UID_CACHE_PREFIX_KEY}{msg_uid}'
+        email_cache_key = self._uid_cache_key(msg_uid)
         cache.set(
             email_cache_key, email_msg_id, EMAILD_UID_CACHE_TTL
         )
 
-    @timer(email_parser_logger)
-    def fetch_emails_in_chunks(
+    def _archived_msg_ids(
         self,
-        mail: IMAP4,
-        email_ids: list[Union[bytes, str]],
-        skip_msg_ids: set[str] = set(),
-        chunk_size: int = 100,
-    ) -> list[tuple[bytes, Any]]:
+        msg_ids: Iterable[str],
+        err_msg_ids: frozenset[str],
+        date_from: datetime,
+        date_to: datetime,
+    ) -> frozenset[str]:
         """
-        Получает письма чанками, чтобы не перегружать IMAP сервер.
+        Message-ID из msg_ids, которые уже есть в архиве за период и не
+        требуют повторной обработки. Из БД выбирается только пересечение с
+        кандидатами, а не весь архив.
+        """
+        msg_ids = [msg_id for msg_id in msg_ids if msg_id]
 
-        Args:
-            mail (IMAP4): активное IMAP4 соединение
-            email_ids (list): список ID писем (bytes или str)
-            chunk_size (int): размер чанка для FETCH
+        if not msg_ids:
+            return frozenset()
+
+        return frozenset(
+            EmailMessage.objects
+            .filter(
+                email_msg_id__in=msg_ids,
+                email_date__gte=date_from,
+                email_date__lte=date_to,
+            )
+            .values_list('email_msg_id', flat=True)
+        ) - err_msg_ids
+
+    def _cached_msg_ids(
+        self, email_ids: list[Union[bytes, str]]
+    ) -> tuple[list[str], dict[str, str]]:
+        """
+        Message-ID писем, известные по кешу UID (одним запросом к кешу).
 
         Returns:
-            list: список сообщений в сыром виде от imaplib
+            tuple: (ID писем строками, {UID: Message-ID} из кеша)
         """
-        filtered_ids = []
+        current_ids = [
+            id_.decode() if isinstance(id_, bytes) else str(id_)
+            for id_ in email_ids
+        ]
+        keys = {self._uid_cache_key(id_): id_ for id_ in current_ids}
+        cached: dict[str, str] = cache.get_many(list(keys))
+
+        return current_ids, {
+            keys[key]: msg_id for key, msg_id in cached.items()
+        }
+
+    def _fetch_msg_ids(
+        self, mail: IMAP4, email_ids: list[str]
+    ) -> dict[str, str]:
+        """
+        Запрашивает у сервера только заголовок Message-ID писем.
 
-        for id_ in email_ids:
-            current_id = id_.decode() if isinstance(id_, bytes) else str(id_)
+        Returns:
+            dict: {UID: Message-ID}. Письма, для которых заголовок получить
+            или разобрать не удалось, в словарь не попадают и будут
+            скачаны целиком.
+        """
+        if not email_ids:
+            return {}
+
+        chunk_size = EMAIL_HEADERS_FETCH_CHUNK_SIZE
+        commands = [
+            (
+                self._imap_uid_set(email_ids[i:i + chunk_size]),
+                '(BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])',
+            )
+            for i in range(0, len(email_ids), chunk_size)
+        ]
 
-            cache_key = f'{EMAILD_UID_CACHE_PREFIX_KEY}{current_id}'
-            email_msg_id: str | None = cache.get(cache_key)
+        try:
+            responses = self._uid_commands(mail, 'FETCH', commands)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            email_parser_logger.warning(
+                f'Не удалось получить заголовки писем: {e}'
+            )
+            return {}
+
+        uid_msg_ids: dict[str, str] = {}
 
-            if email_msg_id and email_msg_id in skip_msg_ids:
+        for part in responses:
+            if isinstance(part, tuple) and len(part) == 2 and part[1]:
+                uid_raw, header_bytes = part
+                msg_uid = self._fetch_response_uid(uid_raw)
+
+                if msg_uid is None:
+                    continue
+
+                try:
+                    uid_msg_ids[msg_uid] = self.prepare_msg_id(
+                        self.header_parser.parsebytes(header_bytes)[
+                            'Message-ID'
+                        ]
+                    )
+                except Exception:
+                    continue
+
+        return uid_msg_ids
+
+    def _drop_archived_ids(
+        self,
+        mail: IMAP4,
+        email_ids: list[Union[bytes, str]],
+        err_msg_ids: frozenset[str],
+        date_from: datetime,
+        date_to: datetime,
+    ) -> list[str]:
+        """
+        Отбрасывает письма, которые уже есть в архиве, чтобы не скачивать
+        их целиком.
+
+        Message-ID берутся из кеша UID, а для остальных писем сервер
+        отдаёт только заголовок Message-ID. Архив проверяется одним
+        запросом к БД сразу для всех писем.
+        """
+        current_ids, uid_msg_ids = self._cached_msg_ids(email_ids)
+
+        if not current_ids:
+            return current_ids
+
+        fetched_msg_ids = self._fetch_msg_ids(
+            mail, [id_ for id_ in current_ids if id_ not in uid_msg_ids]
+        )
+        uid_msg_ids.update(fetched_msg_ids)
+
+        archived_msg_ids = self._archived_msg_ids(
+            uid_msg_ids.values(), err_msg_ids, date_from, date_to
+        )
+
+        filtered_ids = []
+        uid_cache = {}
+
+        for id_ in current_ids:
+            email_msg_id = uid_msg_ids.get(id_)
+
+            if email_msg_id in archived_msg_ids:
+                if id_ in fetched_msg_ids:
+                    uid_cache[self._uid_cache_key(id_)] = email_msg_id
                 continue
 
-            filtered_ids.append(current_id)
+            filtered_ids.append(id_)
 
-        total = len(filtered_ids)
+        # Одна запись в кеш на все найденные в архиве письма:
+        if uid_cache:
+            cache.set_many(uid_cache, EMAILD_UID_CACHE_TTL)
 
-        if total == 0:
+        if not filtered_ids:
             email_parser_logger.debug(
                 'Все письма были отфильтрованы. '
                 'Запрос к серверу не выполняется.'
             )
-            return []
+        else:
+            email_parser_logger.debug(
+                f'{len(filtered_ids)} из {len(current_ids)} писем '
+                'отсутствуют в архиве и будут скачаны'
+            )
+
+        return filtered_ids
 
-        all_messages = []
-        email_parser_logger.debug(
-            f'Всего {len(email_ids)} исходных, {total} после фильтрации'
+    def _drop_archived_parsed(
+        self,
+        parsed_emails: list[dict],
+        folder: EmailFolder,
+        err_msg_ids: frozenset[str],
+        date_from: datetime,
+        date_to: datetime,
+    ) -> list[dict]:
+        """
+        Отбрасывает уже скачанные и разобранные письма, которые есть в
+        архиве, и дополняет остальные полями, для которых нужна БД.
+
+        _drop_archived_ids отсеивает архивные письма до скачивания, но если
+        заголовки получить не удалось или Message-ID не разобрался, письмо
+        скачивается целиком. Без этой проверки оно повторно прошло бы через
+        add_email_message, регистрацию инцидента и автоответ. Архив и
+        ссылки References проверяются одним запросом на пачку писем.
+        """
+        archived_msg_ids = self._archived_msg_ids(
+            (parsed['data']['email_msg_id'] for parsed in parsed_emails),
+            err_msg_ids,
+            date_from,
+            date_to,
         )
 
-        for i in range(0, total, chunk_size):
-            chunk = filtered_ids[i:i + chunk_size]
-            id_range = ','.join(chunk)
+        new_emails = []
+        uid_cache = {}
 
-            try:
-                status, messages = mail.fetch(id_range, '(RFC822)')
-            except KeyboardInterrupt:
-                raise
-            except (imaplib.IMAP4.abort, ConnectionResetError, OSError):
-                email_parser_logger.warning(
-                    'Соединение разорвано при обработке чанка'
-                )
-                continue
-            except Exception as e:
-                email_parser_logger.error(
-                    'Ошибка при FETCH (ids=%s): %s', id_range, str(e)
+        for parsed in parsed_emails:
+            data: dict = parsed['data']
+            email_msg_id: str = data['email_msg_id']
+
+            if email_msg_id in archived_msg_ids:
+                uid_cache[self._uid_cache_key(parsed['msg_uid'])] = (
+                    email_msg_id
                 )
                 continue
 
+            new_emails.append(parsed)
+
+        if uid_cache:
+            cache.set_many(uid_cache, EMAILD_UID_CACHE_TTL)
+
+        # Из наших писем нужны только те, на которые есть ссылки. Ссылки
+        # всей пачки проверяются одним запросом:
+        references = {
+            reference
+            for parsed in new_emails
+            for reference in parsed['data']['email_msg_references'] or ()
+        }
+        our_message_ids = frozenset(
+            EmailMessage.objects
+            .filter(email_msg_id__in=references)
+            .values_list('email_msg_id', flat=True)
+        ) if references else frozenset()
+
+        for parsed in new_emails:
+            data: dict = parsed['data']
+            self._resolve_thread_fields(data, our_message_ids)
+            data['folder'] = folder
+
+        return new_emails
+
+    def fetch_emails_in_chunks(
+        self,
+        mail: IMAP4,
+        email_ids: list[str],
+        chunk_size: int = EMAIL_FETCH_CHUNK_SIZE,
+    ) -> Iterator[list[tuple[bytes, Any]]]:
+        """
+        Получает письма чанками, чтобы не перегружать IMAP сервер.
+
+        Сообщения отдаются пачками по мере получения очередного чанка,
+        поэтому в памяти одновременно находится не больше пары чанков.
+
+        Args:
+            mail (IMAP4): активное IMAP4 соединение
+            email_ids (list): список ID писем
+            chunk_size (int): размер чанка для FETCH
+
+        Yields:
+            list: сообщения чанка в сыром виде от imaplib
+        """
+        for i in range(0, len(email_ids), chunk_size):
+            yield self._fetch_chunk(
+                mail, self._imap_uid_set(email_ids[i:i + chunk_size])
+            )
+
+    def _uid_commands(
+        self,
+        mail: IMAP4,
+        name: str,
+        commands: list[tuple[str, ...]],
+    ) -> list[Any]:
+        """
+        Выполняет команды UID SEARCH / UID FETCH по очереди через IMAP4.uid:
+        в отличие от порядковых номеров UID не меняются при удалении писем
+        из папки.
+
+        Returns:
+            list: ответы всех команд в порядке их получения
+        """
+        responses = []
+
+        for args in commands:
+            status, data = mail.uid(name, *args)
+
             if status != 'OK':
                 email_parser_logger.warning(
-                    f'Ошибка при получении писем (status={status})'
+                    f'Ошибка при выполнении {name} {args} (status={status})'
                 )
                 continue
 
-            all_messages.extend(messages)
+            responses.extend(item for item in data if item is not None)
+
+        return responses
+
+    def _fetch_chunk(
+        self, mail: IMAP4, id_range: str
+    ) -> list[tuple[bytes, Any]]:
+        """FETCH одного чанка писем."""
+        name = 'FETCH'
+
+        try:
+            return self._uid_commands(mail, name, [(id_range, '(RFC822)')])
+        except KeyboardInterrupt:
+            raise
+        except (imaplib.IMAP4.abort, ConnectionResetError, OSError):
+            email_parser_logger.warning(
+                'Соединение разорвано при обработке чанка'
+            )
+        except Exception as e:
+            email_parser_logger.error(
+                'Ошибка при FETCH (ids=%s): %s', id_range, str(e)
+            )
+
+        # Письма, успевшие прийти до ошибки:
+        return mail.untagged_responses.pop(name, [])
+
+    @classmethod
+    def _parse_fetch_response(
+        cls,
+        batches: Iterable[list[tuple[bytes, Any]]],
+    ) -> Iterator[list[tuple[bytes, str]]]:
+        """Разбирает ответы FETCH в списки (исходные байты, UID) по чанкам."""
+        for batch in batches:
+            window = []
+            for part in batch:
+                if isinstance(part, tuple) and len(part) == 2:
+                    uid_raw, msg_bytes = part
+
+                    if not msg_bytes:
+                        continue
+
+                    msg_uid = cls._fetch_response_uid(uid_raw)
 
-        return all_messages
+                    if msg_uid is None:
+                        continue
+
+                    window.append((msg_bytes, msg_uid))
+
+            yield window
 
     @property
     def folders_list(self):
         """Список доступных папок в почте."""
-        with imaplib.IMAP4_SSL(self.email_server, self.email_port) as mail:
-            mail.login(self.email_login, self.email_pswd)
-            _, folders = mail.list()
-            return [
-                imap_folder.decode() for imap_folder in folders
+        mail = self.get_mail(self._mail_mailbox or self.inbox_folder_name)
+        _, folders = mail.list()
+        return [
+            imap_folder.decode() for imap_folder in folders
+        ]
+
+    def _save_parsed_emails(
+        self,
+        parsed_emails: list[dict],
+        email_err_msg_ids: list[str],
+        email_err_msg_ids_to_del: list[str],
+    ):
+        """
+        Записывает пачку разобранных писем в БД.
+
+        Новые письма и их связанные записи добавляются массово, после чего
+        для каждого письма по порядку сохраняется MIME и регистрируется
+        инцидент. Письма, которые уже есть в БД (повторная обработка
+        EmailErr), обновляются через add_email_message.
+
+        Массово добавленные письма до окончания обработки числятся в
+        EmailErr: если обработка письма не удалась или процесс прервался,
+        письмо не считается архивным и при следующем запуске
+        обрабатывается повторно.
+        """
+        from incidents.services.send_auto_reply import AutoReply
+
+        if not parsed_emails:
+            return
+
+        try:
+            email_msgs = self.add_email_messages_bulk(
+                [parsed['data'] for parsed in parsed_emails]
+            )
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            email_parser_logger.exception(
+                'Ошибка массового добавления писем, добавляем по одному'
+            )
+            email_msgs = {}
+
+        for parsed in parsed_emails:
+            data: dict = parsed['data']
+            email_msg_id: str = data['email_msg_id']
+
+            try:
+                with transaction.atomic():
+                    email_msg = email_msgs.pop(email_msg_id, None)
+                    is_bulk_created = email_msg is not None
+
+                    if email_msg is None:
+                        email_msg = self.add_email_message(**data)
+                        email_mime, _ = EmailMime.objects.get_or_create(
+                            email_msg=email_msg
+                        )
+                    else:
+                        # Письмо только что добавлено массово, MIME у него
+                        # ещё нет: обходимся без SELECT на каждое письмо.
+                        email_mime = EmailMime(email_msg=email_msg)
+
+                    filename = f'{email_msg_id}.eml'
+                    email_mime.file_url.save(
+                        filename,
+                        ContentFile(parsed['raw_msg_bytes']),
+                        save=True,
+                    )
+
+                    self.add_incident_from_email(
+                        email_msg, self.yt_manager
+                    )
+
+                    # Обновляем объект в памяти
+                    email_msg.refresh_from_db()
+
+                    AutoReply().open_incident_or_reply(
+                        email_msg, self.email_login
+                    )
+                    turn_off_incident_auto_close(email_msg)
+
+                    # Письмо обработано: отметка в EmailErr, поставленная
+                    # при массовом добавлении, снимается в той же транзакции:
+                    if is_bulk_created:
+                        EmailErr.objects.filter(
+                            email_msg_id=email_msg_id
+                        ).delete()
+
+                email_err_msg_ids_to_del.append(email_msg_id)
+
+                self._save_uid_2_cache(parsed['msg_uid'], email_msg_id)
+
+            except KeyboardInterrupt:
+                raise
+            except IntegrityError:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.error(
+                    f'Ошибка добавления email: {email_msg_id}',
+                    exc_info=True
+                )
+            except RequestException:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.error(
+                    f'Ошибка добавления email: {email_msg_id}',
+                    exc_info=True
+                )
+            except (ApiTooManyRequests, ApiServerError) as e:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.warning(e)
+            except YandexTrackerAuthErr as e:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.critical(e)
+            except tuple(API_STATUS_EXCEPTIONS.values()) as e:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.error(e)
+            except Exception:
+                email_err_msg_ids.append(email_msg_id)
+                email_parser_logger.exception(f'Данные письма: {data}')
+
+    def _process_parts(
+        self,
+        msg: message.Message,
+        email_msg_id: str,
+        email_date: datetime,
+        email_subject: Optional[str],
+    ) -> tuple[list[str], list[str], Optional[str], bool]:
+        """
+        Обходит части multipart письма: сохраняет вложения и картинки из
+        текста, собирает текст письма.
+
+        Returns:
+            tuple: (вложения, картинки из текста, текст письма, была ли
+            ошибка записи файла на диск)
+        """
+        email_attachments_urls = []
+        email_attachments_intext_urls = []
+        email_body = None
+
+        save_file_err = False
+        has_html_part = False
+
+        # Хеш нужен только для уникальности имени файла:
+        email_msg_id_hash: str = hashlib.md5(
+            email_msg_id.encode(), usedforsecurity=False
+        ).hexdigest()
+        filename_prefix = (
+            f'{email_date.strftime("%H%M%S")}__'
+            f'{email_msg_id_hash}__'
+        )
+        attachments_dir = self.email_attachments_dir(email_date)
+
+        for sub_index, part in enumerate(msg.walk()):
+            unique_filename_part: str = (
+                f'{filename_prefix}{sub_index}__'
+            )
+
+            content_type: Optional[str] = (
+                part.get_content_type()
+            )
+            content_disposition: Optional[str] = (
+                part.get_content_disposition()
+            )
+
+            if (
+                (
+                    content_disposition
+                    and content_disposition == 'attachment'
+                )
+                or (
+                    content_type
+                    and content_type == 'message/rfc822'
+                )
+            ):
+                original_file_name: Optional[str] = (
+                    part.get_filename()
+                )
+
+                if (
+                    not original_file_name
+                    and content_type
+                    and content_type == 'message/rfc822'
+                ):
+                    original_file_name = 'msg.eml'
+
+                if not original_file_name:
+                    continue
+
+                email_filename: str = (
+                    self.prepare_text_from_encode(
+                        original_file_name
+                    )
+                )
+                try:
+                    filename = (
+                        f'{unique_filename_part}'
+                        f'{email_filename}'
+                    )
+                    self.save_email_attachments(
+                        email_date, filename, part, attachments_dir
+                    )
+                    email_attachments_urls.append(
+                        filename
+                    )
+                except ValidationError as e:
+                    email_parser_logger.warning(e)
+                except OSError:
+                    save_file_err = True
+
+            elif (
+                content_type and content_type.startswith(
+                    'image/'
+                )
+            ):
+                try:
+                    filename = (
+                        f'{unique_filename_part}'
+                        f'intext.{content_type.split("/")[1]}'
+                    )
+                    self.save_email_attachments(
+                        email_date,
+                        filename,
+                        part,
+                        attachments_dir,
+                    )
+                    email_attachments_intext_urls.append(
+                        filename
+                    )
+                except ValidationError as e:
+                    email_parser_logger.warning(e)
+                except OSError:
+                    save_file_err = True
+
+            elif (
+                content_type and content_type in (
+                    'text/plain', 'text/html'
+                )
+            ):
+                # Текст письма берём из первой текстовой части:
+                if email_body is None:
+                    email_body = self.prepare_text_from_bytes(part)
+
+                if content_type == 'text/html':
+                    has_html_part = True
+                    original_file_name = part.get_filename()
+
+                    if original_file_name:
+                        try:
+                            filename = (
+                                f'{unique_filename_part}'
+                                f'{original_file_name}'
+                            )
+
+                            self.save_email_attachments(
+                                email_date,
+                                filename,
+                                part,
+                                attachments_dir,
+                            )
+
+                            email_attachments_urls.append(
+                                filename
+                            )
+
+                        except ValidationError as e:
+                            email_parser_logger.warning(e)
+                        except OSError:
+                            save_file_err = True
+
+        # HTML переводится в текст один раз, а не для каждой
+        # text/html части письма:
+        if has_html_part:
+            email_body = self.prepare_text_from_html(email_body)
+            if email_subject:
+                # Тема дублируется заголовком HTML (<title>)
+                # в начале текста, убираем только его:
+                email_body = email_body.replace(email_subject, '', 1)
+            email_body = email_body.strip()
+
+        return (
+            email_attachments_urls,
+            email_attachments_intext_urls,
+            email_body,
+            save_file_err,
+        )
+
+    def _parse_email(
+        self, msg_bytes: bytes
+    ) -> tuple[Optional[str], Optional[dict], bool]:
+        """
+        Разбирает письмо и сохраняет его вложения без обращения к БД.
+
+        Метод выполняется и в основном процессе, и в дочерних процессах
+        ProcessPoolExecutor, поэтому принимает только байты письма и
+        возвращает данные, которые можно передать между процессами.
+
+        Returns:
+            tuple: (Message-ID, данные письма, признак ошибки). Данные
+            равны None, если письмо пропущено или его не удалось разобрать.
+        """
+        email_msg_id = None
+
+        try:
+            # parse(BytesIO) декодирует письмо порциями по мере разбора,
+            # а parsebytes сначала делает из него целиком str и StringIO:
+            # пиковая память на письмо с вложениями меньше примерно втрое.
+            msg = self.msg_parser.parse(BytesIO(msg_bytes))
+            # Каждый доступ к заголовку — линейный проход по списку
+            # заголовков письма, поэтому методы связываем один раз:
+            get, get_all = msg.get, msg.get_all
+
+            email_msg_id = self.prepare_msg_id(get('Message-ID'))
+
+            subject_header = get('Subject')
+            if subject_header is not None:
+                subject, encoding_sj = header.decode_header(
+                    subject_header)[0]
+            else:
+                subject, encoding_sj = None, None
+
+            encoding = (
+                msg.get_content_charset() or encoding_sj or 'utf-8'
+            )
+
+            email_subject: str = self.prepare_subject_from_bytes(
+                subject, encoding
+            )
+            if email_subject and 'undeliverable mail' in (
+                email_subject.lower()
+            ):
+                return email_msg_id, None, False
+
+            email_from: str = self.prepare_email_from(get('From'))
+            email_from_lower = email_from.lower()
+
+            email_date: datetime = self.prepare_email_date(get('Date'))
+            email_date = self.normalize_email_datetime(
+                email_date, email_msg_id
+            )
+
+            in_reply_to = get('In-Reply-To')
+            prepared_id: Optional[str] = (
+                self.prepare_msg_id(in_reply_to)
+                if in_reply_to and in_reply_to.strip() else None
+            )
+            email_msg_reply_id: Optional[str] = (
+                prepared_id
+                if prepared_id and prepared_id.strip() else None
+            )
+
+            raw_to = self.prepare_email_to(get_all('To', []), email_msg_id)
+            email_to: list[str] = [
+                addr for addr in dict.fromkeys(raw_to)
+                if addr.lower() != email_from_lower
+            ]
+
+            raw_cc_bcc = (
+                self.prepare_email_to(get_all('Cc', []), email_msg_id)
+                + self.prepare_email_to(get_all('Bcc', []), email_msg_id)
+            )
+            _cc_bcc_check = {addr.lower() for addr in email_to}
+            _cc_bcc_check.add(email_from_lower)
+            email_to_cc: list[str] = [
+                addr for addr in dict.fromkeys(raw_cc_bcc)
+                if addr.lower() not in _cc_bcc_check
             ]
 
+            references: Optional[str] = get('References')
+            email_msg_references = [
+                prepared
+                for reference in (
+                    MSG_ID_RE.findall(references) if references else []
+                )
+                if (prepared := self.prepare_msg_id(reference).strip())
+            ]
+            email_msg_references = list(
+                dict.fromkeys(email_msg_references)
+            )
+
+            if msg.is_multipart():
+                (
+                    email_attachments_urls,
+                    email_attachments_intext_urls,
+                    email_body,
+                    save_file_err,
+                ) = self._process_parts(
+                    msg, email_msg_id, email_date, email_subject
+                )
+            else:
+                email_attachments_urls = []
+                email_attachments_intext_urls = []
+                save_file_err = False
+
+                html_body_text = self.prepare_text_from_bytes(msg)
+                email_body = self.prepare_text_from_html(
+                    html_body_text
+                )
+
+            if save_file_err:
+                email_parser_logger.warning((
+                    'Ошибка при сохранении файла для email: ',
+                    email_msg_id
+                ))
+
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            if email_msg_id:
+                email_parser_logger.exception(
+                    f'Ошибка при обрабоке email: {email_msg_id}'
+                )
+            return email_msg_id, None, bool(email_msg_id)
+
+        json_dicts = None
+        if email_body:
+            json_dicts, _ = self.parse_all_json_from_text(
+                email_body, with_text=False
+            )
+            email_body = EmailManager.normalize_text_with_json(email_body)
+        else:
+            email_body = None
+
+        email_subject = EmailManager.normalize_text_with_json(
+            email_subject
+        ) if email_subject else None
+
+        is_email_from_yandex_tracker = (
+            self._is_from_yandex_tracker(msg, email_subject)
+        )
+
+        email_subject = EmailValidator.normalize_invisible_spaces(
+            email_subject
+        )
+
+        return email_msg_id, {
+            'email_msg_id': email_msg_id,
+            'email_msg_reply_id': email_msg_reply_id,
+            'email_subject': email_subject,
+            'email_from': email_from,
+            'email_date': email_date,
+            'email_body': email_body,
+            'json_dicts': json_dicts,
+            'is_email_from_yandex_tracker': is_email_from_yandex_tracker,
+            'was_added_2_yandex_tracker': is_email_from_yandex_tracker,
+            'email_to': email_to,
+            'email_to_cc': email_to_cc,
+            'email_msg_references': email_msg_references,
+            'email_attachments_urls': email_attachments_urls,
+            'email_attachments_intext_urls': email_attachments_intext_urls,
+        }, False
+
+    def _parse_emails(
+        self,
+        batches: Iterable[list[tuple[bytes, Any]]],
+        total: int,
+    ) -> Iterator[tuple[bytes, str, tuple]]:
+        """
+        Разбирает полученные письма, при большом объёме — в процессах.
+
+        Разбор (MIME, HTML, JSON, вложения) занимает процессор и не
+        зависит от других писем, поэтому при total не меньше
+        EMAIL_PARSER_PROCESS_MIN_COUNT чанки FETCH раздаются процессам
+        ProcessPoolExecutor. Следующий чанк отправляется в пул до того, как
+        забираются результаты предыдущего, так что чтение ответа IMAP
+        идёт параллельно с разбором. Порядок писем сохраняется.
+
+        Yields:
+            tuple: (исходные байты, UID, результат _parse_email)
+        """
+        windows = self._parse_fetch_response(batches)
+        workers = os.cpu_count() or 1
+
+        if total < EMAIL_PARSER_PROCESS_MIN_COUNT or workers < 2:
+            for window in windows:
+                for msg_bytes, msg_uid in window:
+                    yield msg_bytes, msg_uid, self._parse_email(msg_bytes)
+            return
+
+        # spawn, а не fork: процессы не наследуют IMAP соединение,
+        # соединения с БД и потоки. Записи их логов пишет этот процесс:
+        mp_context = multiprocessing.get_context('spawn')
+        log_queue = mp_context.Queue()
+        log_listener = QueueListener(log_queue, ParentLogHandler())
+        log_listener.start()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=mp_context,
+                initializer=init_worker,
+                initargs=(log_queue,),
+            ) as executor:
+                pending = None
+                for window in windows:
+                    results = executor.map(
+                        parse_email,
+                        [msg_bytes for msg_bytes, _ in window],
+                        chunksize=EMAIL_PARSER_PROCESS_CHUNK_SIZE,
+                    )
+                    if pending is not None:
+                        yield from self._zip_parsed_window(*pending)
+                    pending = (window, results)
+
+                if pending is not None:
+                    yield from self._zip_parsed_window(*pending)
+        finally:
+            log_listener.stop()
+
+    @staticmethod
+    def _zip_parsed_window(
+        window: list[tuple[bytes, Any]], results: Iterator[tuple]
+    ) -> Iterator[tuple[bytes, str, tuple]]:
+        for (msg_bytes, msg_uid), result in zip(window, results):
+            yield msg_bytes, msg_uid, result
+
+    def _resolve_thread_fields(
+        self, data: dict, our_message_ids: frozenset[str]
+    ):
+        """
+        Дополняет данные разобранного письма полями, для которых нужна БД:
+        is_first_email и отправитель/наблюдатели из JSON формы обращения.
+
+        Args:
+            our_message_ids: message_id из References писем пачки, которые
+            уже есть в нашей системе (см. _drop_archived_parsed).
+        """
+        json_dicts = data.pop('json_dicts')
+
+        is_first_email = self._is_first_email(
+            data['email_msg_reply_id'],
+            data['email_msg_references'],
+            data['email_msg_id'],
+            our_message_ids
+        )
+
+        if json_dicts and is_first_email:
+            email_from_i = json_dicts[0].get(
+                'E-mail для обратной связи'
+            )
+
+            email_cc_i = []
+            for key, value in json_dicts[0].items():
+                if (
+                    isinstance(key, str)
+                    and key.startswith(
+                        'E-mail наблюдателя по заявке'
+                    )
+                ):
+                    email_cc_i.append(value)
+
+            if email_cc_i:
+                data['email_to_cc'] = email_cc_i + data['email_to_cc']
+            if email_from_i:
+                data['email_from'] = email_from_i
+
+        data['is_first_email'] = is_first_email
+
     @min_wait_timer(email_parser_logger)
     @timer(email_parser_logger)
     def fetch_unread_emails(
@@ -383,14 +1417,14 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
                 Папка для проверки новых писем.
                 По умолчанию стандартная папка входящих писем INBOX.
         """
-        from incidents.services.send_auto_reply import AutoReply
+        today = timezone.now()
 
         if (
             check_days == 0
             and self.is_time_in_range(
                 start=time(0, 0),
                 end=time(0, 30),
-                check_time=datetime.now(ZoneInfo('Europe/Moscow')).time()
+                check_time=timezone.localtime(today).time()
             )
         ):
             check_days = 1
@@ -413,472 +1447,80 @@ class EmailParser(EmailValidator, EmailManager, IncidentManager):
         else:
             folder, _ = EmailFolder.objects.get_or_create(name=mailbox)
 
-        today = timezone.now()
         err_days_ago = today - timedelta(
             days=max((check_days + 1), (check_err_days + 1))
         )
 
-        err_msg_ids: set[str] = set(
+        err_msg_ids: frozenset[str] = frozenset(
             EmailErr.objects
             .filter(incert_date__gte=err_days_ago, incert_date__lte=today)
             .values_list('email_msg_id', flat=True)
         )
 
-        archive_msg_ids: set[str] = set(
-            EmailMessage.objects
-            .filter(email_date__gte=err_days_ago, email_date__lte=today)
-            .values_list('email_msg_id', flat=True)
-        )
-
-        new_emails_ids = (
-            self._find_emails_by_date(today, check_days, mail)
+        found_emails_ids = self._search_emails(
+            mail, today, check_days, err_msg_ids, check_err_days
         )
 
-        found_emails_ids = self._find_email_by_id(
-            err_msg_ids, mail, today, check_err_days
+        # По возрастанию UID: письма обрабатываются в порядке поступления, а
+        # соседние UID сжимаются в диапазоны a:b в командах FETCH.
+        email_ids = self._drop_archived_ids(
+            mail,
+            sorted(set(found_emails_ids), key=int),
+            err_msg_ids,
+            err_days_ago,
+            today,
         )
-
-        email_ids = list(set(new_emails_ids + found_emails_ids))
-        skip_msg_ids = archive_msg_ids - err_msg_ids
-
-        messages = self.fetch_emails_in_chunks(mail, email_ids, skip_msg_ids)
-
-        parsed_messages: list[tuple[message.Message, bytes, str]] = []
-        for part in messages:
-            if isinstance(part, tuple) and len(part) == 2:
-                uid_raw, msg_bytes = part
-
-                if not msg_bytes:
-                    continue
-
-                msg = email.message_from_bytes(msg_bytes)
-                msg_uid = uid_raw.split()[0].decode().strip('()')
-
-                parsed_messages.append((msg, msg_bytes, msg_uid))
+        messages = self.fetch_emails_in_chunks(mail, email_ids)
 
         email_err_msg_ids = []
         email_err_msg_ids_to_del = []
+        parsed_emails: list[dict] = []
         email_msg_counter = 0
 
-        total = len(parsed_messages)
-
-        our_message_ids = set(
-            EmailMessage.objects.all()
-            .values_list('email_msg_id', flat=True)
-        )
+        total = len(email_ids)
 
-        for index, (msg, raw_msg_bytes, msg_uid) in enumerate(parsed_messages):
+        for index, (raw_msg_bytes, msg_uid, result) in enumerate(
+            self._parse_emails(messages, total)
+        ):
 
             PrettyPrint.progress_bar_debug(
                 index, total, f'Парсинг почты (папка {folder.name}):')
-            email_msg_id = None
 
-            try:
-                email_msg_id: str = self.prepare_msg_id(msg['Message-ID'])
+            email_msg_id, data, is_err = result
 
-                if (
-                    email_msg_id in archive_msg_ids
-                    and email_msg_id not in err_msg_ids
-                ):
-                    self._save_uid_2_cache(msg_uid, email_msg_id)
-                    continue
+            if email_msg_id:
                 email_msg_counter += 1
 
-                subject_header = msg.get('Subject')
-                if subject_header is not None:
-                    subject, encoding_sj = header.decode_header(
-                        subject_header)[0]
-                else:
-                    subject, encoding_sj = None, None
-
-                encoding = (
-                    msg.get_content_charset() or encoding_sj or 'utf-8'
-                )
-
-                email_subject: str = self.prepare_subject_from_bytes(
-                    subject, encoding
-                )
-                if email_subject and 'undeliverable mail' in (
-                    email_subject.lower()
-                ):
-                    continue
-
-                email_from: str = self.prepare_email_from(msg['From'])
-
-                cleaned_date_string = msg.get('Date').split(' (')[0]
-                try:
-                    email_date: datetime = datetime.strptime(
-                        cleaned_date_string, '%a, %d %b %Y %H:%M:%S %z'
-                    )
-                except ValueError:
-                    email_date: datetime = datetime.strptime(
-                        cleaned_date_string, '%d %b %Y %H:%M:%S %z'
-                    )
-
-                email_date = self.normalize_email_datetime(
-                    email_date, email_msg_id
-                )
-
-                in_reply_to = msg.get('In-Reply-To')
-                prepared_id: Optional[str] = (
-                    self.prepare_msg_id(in_reply_to)
-                    if in_reply_to and in_reply_to.strip() else None
-                )
-                email_msg_reply_id: Optional[str] = (
-                    prepared_id
-                    if prepared_id and prepared_id.strip() else None
-                )
-
-                raw_to = self.prepare_email_to(
-                    msg.get_all('To', []), email_msg_id
-                )
-                email_to: list[str] = [
-                    addr for addr in dict.fromkeys(raw_to)
-                    if addr.lower() != email_from.lower()
-                ]
-
-                raw_cc_bcc = (
-                    self.prepare_email_to(
-                        msg.get_all('Cc', []), email_msg_id
-                    )
-                    + self.prepare_email_to(
-                        msg.get_all('Bcc', []), email_msg_id
-                    )
-                )
-                _cc_bcc_check = {addr.lower() for addr in email_to}
-                email_to_cc: list[str] = [
-                    addr for addr in dict.fromkeys(raw_cc_bcc)
-                    if (
-                        addr.lower() != email_from.lower()
-                        and addr.lower() not in _cc_bcc_check
-                    )
-                ]
-
-                references: Optional[str] = msg.get('References')
-                email_msg_references = [
-                    prepared
-                    for reference in (
-                        references.split('<') if references else []
-                    )
-                    if (
-                        (prepared := self.prepare_msg_id(f'<{reference}'))
-                        and prepared.strip()
-                    )
-                ]
-                email_msg_references = list(
-                    dict.fromkeys(email_msg_references)
-                )
-
-                email_attachments_urls = []
-                email_attachments_intext_urls = []
-                email_body = None
-
-                save_file_err = False
-
-                if msg.is_multipart():
-                    for sub_index, part in enumerate(msg.walk()):
-                        email_msg_id_hash: str = (
-                            hashlib.md5(email_msg_id.encode()).hexdigest()
-                        )
-                        unique_filename_part: str = (
-                            f'{email_date.strftime("%H%M%S")}__'
-                            f'{email_msg_id_hash}__{sub_index}__'
-                        )
-
-                        content_type: Optional[str] = (
-                            part.get_content_type()
-                        )
-                        content_disposition: Optional[str] = (
-                            part.get_content_disposition()
-                        )
-
-                        if (
-                            (
-                                content_disposition
-                                and content_disposition == 'attachment'
-                            )
-                            or (
-                                content_type
-                                and content_type == 'message/rfc822'
-                            )
-                        ):
-                            original_file_name: Optional[str] = (
-                                part.get_filename()
-                            )
-
-                            if (
-                                not original_file_name
-                                and content_type
-                                and content_type == 'message/rfc822'
-                            ):
-                                original_file_name = 'msg.eml'
-
-                            if not original_file_name:
-                                continue
-
-                            email_filename: str = (
-                                self.prepare_text_from_encode(
-                                    original_file_name
-                                )
-                            )
-                            try:
-                                filename = (
-                                    f'{unique_filename_part}'
-                                    f'{email_filename}'
-                                )
-                                self.save_email_attachments(
-                                    email_date, filename, part
-                                )
-                                email_attachments_urls.append(
-                                    filename
-                                )
-                            except ValidationError as e:
-                                email_parser_logger.warning(e)
-                            except OSError:
-                                save_file_err = True
-
-                        elif (
-                            content_type and content_type.startswith(
-                                'image/'
-                            )
-                        ):
-                            try:
-                                filename = (
-                                    f'{unique_filename_part}'
-                                    f'intext.{content_type.split("/")[1]}'
-                                )
-                                self.save_email_attachments(
-                                    email_date,
-                                    filename,
-                                    part,
-                                )
-                                email_attachments_intext_urls.append(
-                                    filename
-                                )
-                            except ValidationError as e:
-                                email_parser_logger.warning(e)
-                            except OSError:
-                                save_file_err = True
-
-                        elif (
-                            content_type and content_type in (
-                                'text/plain', 'text/html'
-                            )
-                        ):
-                            email_body_part = (
-                                self.prepare_text_from_bytes(part)
-                                if email_body is None else email_body
-                            )
-
-                            if content_type == 'text/html':
-                                cleaned_html = (
-                                    self
-                                    .prepare_text_from_html(
-                                        email_body_part
-                                    )
-                                    .replace(email_subject or '', '')
-                                    .strip()
-                                )
-
-                                original_file_name = part.get_filename()
-
-                                if original_file_name:
-                                    try:
-                                        filename = (
-                                            f'{unique_filename_part}'
-                                            f'{original_file_name}'
-                                        )
-
-                                        self.save_email_attachments(
-                                            email_date, filename, part
-                                        )
-
-                                        email_attachments_urls.append(
-                                            filename
-                                        )
-
-                                    except ValidationError as e:
-                                        email_parser_logger.warning(e)
-                                    except OSError:
-                                        save_file_err = True
-
-                                email_body = cleaned_html
-
-                            elif content_type == 'text/plain':
-                                email_body = (
-                                    email_body_part
-                                    if email_body is None else email_body
-                                )
-
-                else:
-                    html_body_text = self.prepare_text_from_bytes(msg)
-                    email_body = self.prepare_text_from_html(
-                        html_body_text
-                    )
-
-                if save_file_err:
-                    email_parser_logger.warning((
-                        'Ошибка при сохранении файла для email: ',
-                        email_msg_id
-                    ))
-
-            except KeyboardInterrupt:
-                raise
-            except Exception:
-                if email_msg_id:
-                    email_parser_logger.exception(
-                        f'Ошибка при обрабоке email: {email_msg_id}'
-                    )
-                    email_err_msg_ids.append(email_msg_id)
-            else:
-                json_dicts = None
-                if email_body:
-                    json_dicts, _ = EmailParser.parse_all_json_from_text(
-                        email_body
-                    )
-                    email_body = EmailManager.normalize_text_with_json(
-                        email_body
-                    )
-                else:
-                    email_body = None
-
-                email_subject = EmailManager.normalize_text_with_json(
-                    email_subject
-                ) if email_subject else None
-
-                is_first_email = self._is_first_email(
-                    email_msg_reply_id,
-                    email_msg_references,
-                    email_msg_id,
-                    our_message_ids
-                )
-
-                if json_dicts and is_first_email:
-                    email_from_i = json_dicts[0].get(
-                        'E-mail для обратной связи'
-                    )
+            if is_err:
+                email_err_msg_ids.append(email_msg_id)
+                continue
 
-                    email_cc_i = []
-                    for key, value in json_dicts[0].items():
-                        if (
-                            isinstance(key, str)
-                            and key.startswith(
-                                'E-mail наблюдателя по заявке'
-                            )
-                        ):
-                            email_cc_i.append(value)
-
-                    email_to_cc = (
-                        email_cc_i + email_to_cc
-                    ) if email_cc_i else email_to_cc
-                    email_from = (
-                        email_from_i
-                    ) if email_from_i else email_from
-
-                is_email_from_yandex_tracker = (
-                    self._is_from_yandex_tracker(msg, email_subject)
-                )
+            if data is None:
+                continue
 
-                email_subject = EmailValidator.normalize_invisible_spaces(
-                    email_subject
+            parsed_emails.append({
+                'msg_uid': msg_uid,
+                'raw_msg_bytes': raw_msg_bytes,
+                'data': data,
+            })
+
+            if len(parsed_emails) >= EMAIL_PARSER_BULK_SIZE:
+                self._save_parsed_emails(
+                    self._drop_archived_parsed(
+                        parsed_emails, folder, err_msg_ids, err_days_ago, today
+                    ),
+                    email_err_msg_ids,
+                    email_err_msg_ids_to_del,
                 )
-
-                try:
-                    with transaction.atomic():
-                        email_msg = self.add_email_message(
-                            email_msg_id=email_msg_id,
-                            email_msg_reply_id=email_msg_reply_id,
-                            email_subject=email_subject,
-                            email_from=email_from,
-                            email_date=email_date,
-                            email_body=email_body,
-                            is_first_email=is_first_email,
-                            is_email_from_yandex_tracker=(
-                                is_email_from_yandex_tracker
-                            ),
-                            was_added_2_yandex_tracker=(
-                                is_email_from_yandex_tracker
-                            ),
-                            email_to=email_to,
-                            email_to_cc=email_to_cc,
-                            email_msg_references=email_msg_references,
-                            email_attachments_urls=email_attachments_urls,
-                            email_attachments_intext_urls=(
-                                email_attachments_intext_urls
-                            ),
-                            folder=folder,
-                        )
-
-                        email_mime, _ = EmailMime.objects.get_or_create(
-                            email_msg=email_msg
-                        )
-                        filename = f'{email_msg_id}.eml'
-                        email_mime.file_url.save(
-                            filename, ContentFile(raw_msg_bytes), save=True
-                        )
-
-                        self.add_incident_from_email(
-                            email_msg, self.yt_manager
-                        )
-
-                        # Обновляем объект в памяти
-                        email_msg.refresh_from_db()
-
-                        AutoReply().open_incident_or_reply(
-                            email_msg, self.email_login
-                        )
-                        turn_off_incident_auto_close(email_msg)
-
-                    email_err_msg_ids_to_del.append(email_msg_id)
-
-                    self._save_uid_2_cache(msg_uid, email_msg_id)
-
-                except KeyboardInterrupt:
-                    raise
-                except IntegrityError:
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.error(
-                        f'Ошибка добавления email: {email_msg_id}',
-                        exc_info=True
-                    )
-                except RequestException:
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.error(
-                        f'Ошибка добавления email: {email_msg_id}',
-                        exc_info=True
-                    )
-                except (ApiTooManyRequests, ApiServerError) as e:
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.warning(e)
-                except YandexTrackerAuthErr as e:
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.critical(e)
-                except tuple(API_STATUS_EXCEPTIONS.values()) as e:
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.error(e)
-                except Exception:
-                    invalid_data = {
-                        'email_msg_id': email_msg_id,
-                        'email_msg_reply_id': email_msg_reply_id,
-                        'email_subject': email_subject,
-                        'email_from': email_from,
-                        'email_date': email_date,
-                        'email_body': email_body,
-                        'is_first_email': is_first_email,
-                        'is_email_from_yandex_tracker': (
-                            is_email_from_yandex_tracker),
-                        'email_to': email_to,
-                        'email_to_cc': email_to_cc,
-                        'email_msg_references': email_msg_references,
-                        'email_attachments_urls': email_attachments_urls,
-                        'email_attachments_intext_urls': (
-                            email_attachments_intext_urls
-                        ),
-                        'folder': folder,
-                    }
-                    email_err_msg_ids.append(email_msg_id)
-                    email_parser_logger.exception(
-                        f'Данные письма: {invalid_data}')
+                parsed_emails.clear()
+
+        self._save_parsed_emails(
+            self._drop_archived_parsed(
+                parsed_emails, folder, err_msg_ids, err_days_ago, today
+            ),
+            email_err_msg_ids,
+            email_err_msg_ids_to_del,
+        )
 
         if email_msg_counter:
             email_parser_logger.debug(
@@ -48,31 +48,32 @@ class Command(BaseCommand):
                 current_batch.append(pk)
 
                 if len(current_batch) >= EMAILS_BATCH_SIZE:
-                    count = EmailMessage.objects.filter(
-                        pk__in=current_batch,
-                        email_incident__isnull=True,
-                    ).count()
-                    EmailMessage.objects.filter(
-                        pk__in=current_batch,
-                        email_incident__isnull=True,
-                    ).delete()
-
-                    deleted_count += count
+                    deleted_count += self._delete_batch(current_batch)
                     pbar.update(len(current_batch))
                     current_batch = []
 
             if current_batch:
-                count = EmailMessage.objects.filter(
-                    pk__in=current_batch,
-                    email_incident__isnull=True,
-                ).count()
-                EmailMessage.objects.filter(
-                    pk__in=current_batch,
-                    email_incident__isnull=True,
-                ).delete()
-                deleted_count += count
+                deleted_count += self._delete_batch(current_batch)
                 pbar.update(len(current_batch))
 
         default_logger.info(
             f'Удалено {deleted_count} старых писем без инцидента.'
         )
+
+    @staticmethod
+    def _delete_batch(pks: list[int]) -> int:
+        """
+        Удаляет письма пачки, если к ним так и не привязали инцидент.
+
+        Количество удалённых писем берётся из результата delete(), без
+        отдельного COUNT по той же выборке.
+
+        Returns:
+            int: количество удалённых писем (без связанных записей).
+        """
+        _, deleted_per_model = EmailMessage.objects.filter(
+            pk__in=pks,
+            email_incident__isnull=True,
+        ).delete()
+
+        return deleted_per_model.get(EmailMessage._meta.label, 0)
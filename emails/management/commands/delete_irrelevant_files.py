@@ -1,5 +1,8 @@
 import datetime as dt
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
@@ -10,6 +13,7 @@ from core.loggers import incident_logger
 from core.pretty_print import PrettyPrint
 from emails.constants import (
     EMAILS_FILES_2_DEL_BATCH_SIZE,
+    EMAILS_FILES_2_DEL_WORKERS,
     MAX_EMAILS_ATTACHMENT_DAYS,
 )
 from emails.models import (
@@ -43,6 +47,9 @@ class Command(BaseCommand):
             timezone.now() - dt.timedelta(days=MAX_EMAILS_ATTACHMENT_DAYS)
         )
 
+        # Пути собираются строками, без объекта Path на каждую запись:
+        media_root = settings.MEDIA_ROOT
+
         attachment_models: list[
             EmailAttachment | EmailInTextAttachment | EmailMime
         ] = [EmailAttachment, EmailInTextAttachment, EmailMime]
@@ -67,43 +74,80 @@ class Command(BaseCommand):
             )
 
             total = qs.count()
-            to_delete_ids: list[int] = []
+            files_2_del: list[tuple[int, Optional[str]]] = []
+            progress_msg = f'Проверка старых вложений ({model.__name__}):'
             deleted_count = 0
 
-            for index, attachment in enumerate(
-                qs.iterator(chunk_size=EMAILS_FILES_2_DEL_BATCH_SIZE)
-            ):
-                PrettyPrint.progress_bar_debug(
-                    index, total,
-                    f'Проверка старых вложений ({model.__name__}):'
-                )
-
-                file_path = (
-                    Path(settings.MEDIA_ROOT) / attachment.file_url.name
-                )
-
-                try:
-                    if file_path.exists():
-                        file_path.unlink()
-                        deleted_count += 1
-                except OSError:
-                    incident_logger.warning(
-                        f'Не удалось удалить файл {file_path} для '
-                        f'{model.__name__}'
+            # unlink отпускает GIL, поэтому удаление файлов пачки идёт
+            # параллельно в потоках, а записи удаляются одним запросом:
+            with ThreadPoolExecutor(
+                max_workers=EMAILS_FILES_2_DEL_WORKERS
+            ) as executor:
+                # Модели не создаются — нужны только id и путь к файлу:
+                for index, (attachment_id, file_url) in enumerate(
+                    qs.values_list('id', 'file_url')
+                    .iterator(chunk_size=EMAILS_FILES_2_DEL_BATCH_SIZE)
+                ):
+                    PrettyPrint.progress_bar_debug(index, total, progress_msg)
+
+                    files_2_del.append((
+                        attachment_id,
+                        os.path.join(media_root, file_url)
+                        if file_url else None,
+                    ))
+
+                    if len(files_2_del) >= EMAILS_FILES_2_DEL_BATCH_SIZE:
+                        deleted_count += self._delete_batch(
+                            model, files_2_del, executor
+                        )
+                        files_2_del.clear()
+
+                # удалить хвост
+                if files_2_del:
+                    deleted_count += self._delete_batch(
+                        model, files_2_del, executor
                     )
 
-                to_delete_ids.append(attachment.id)
-
-                if len(to_delete_ids) >= EMAILS_FILES_2_DEL_BATCH_SIZE:
-                    model.objects.filter(id__in=to_delete_ids).delete()
-                    to_delete_ids.clear()
-
-            # удалить хвост
-            if to_delete_ids:
-                model.objects.filter(id__in=to_delete_ids).delete()
-
             if deleted_count:
                 incident_logger.info(
                     f'Удалено {deleted_count} неактуальных вложений '
                     f'для модели {model.__name__}'
                 )
+
+    def _delete_batch(
+        self,
+        model: EmailAttachment | EmailInTextAttachment | EmailMime,
+        files_2_del: list[tuple[int, Optional[str]]],
+        executor: ThreadPoolExecutor,
+    ) -> int:
+        """
+        Удаляет файлы пачки в потоках и записи одним запросом.
+
+        Returns:
+            int: количество реально удалённых файлов.
+        """
+        deleted_count = sum(
+            executor.map(
+                partial(self._unlink_file, model_name=model.__name__),
+                [file_path for _, file_path in files_2_del if file_path],
+            )
+        )
+        model.objects.filter(
+            id__in=[id_ for id_, _ in files_2_del]
+        ).delete()
+
+        return deleted_count
+
+    @staticmethod
+    def _unlink_file(file_path: str, model_name: str) -> bool:
+        """Один системный вызов вместо stat + unlink."""
+        try:
+            os.unlink(file_path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError:
+            incident_logger.warning(
+                f'Не удалось удалить файл {file_path} для {model_name}'
+            )
+            return False
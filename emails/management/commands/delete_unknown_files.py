@@ -1,13 +1,27 @@
 import datetime as dt
+import errno
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
 from django.utils import timezone
 
-from core.constants import EMAIL_MIME_DIR, INCIDENT_DIR, SUBFOLDER_DATE_FORMAT
+from core.constants import (
+    DEBUG_MODE,
+    EMAIL_MIME_DIR,
+    INCIDENT_DIR,
+    SUBFOLDER_DATE_FORMAT,
+    SUBFOLDER_DATE_RE,
+)
 from core.loggers import incident_logger
 from core.pretty_print import PrettyPrint
+from core.threads import tasks_in_threads
+from core.utils import scandir_recursive
 from core.wraps import timer
 from emails.constants import EMAILS_FILES_2_DEL_BATCH_SIZE
 from emails.models import EmailAttachment, EmailInTextAttachment, EmailMime
@@ -24,144 +38,248 @@ class Command(BaseCommand):
             'mimes': Path(EMAIL_MIME_DIR)
         }
 
-        for _, directory in attachment_dirs.items():
-            if not directory.exists():
-                incident_logger.warning(
-                    f'Папки {directory} не существует.'
+        # Пути из БД загружаются один раз на обе папки:
+        valid_files = self._valid_files()
+
+        sweep = partial(self._sweep_directory, valid_files=valid_files)
+
+        if DEBUG_MODE:
+            # Прогресс-бары перерисовывают одну строку терминала и из
+            # нескольких потоков перемешались бы, поэтому в режиме отладки
+            # папки обходятся по очереди в основном потоке:
+            kept_files = list(map(sweep, attachment_dirs.values()))
+        else:
+            # Папки независимы, а шаги 1-3 работают только с диском,
+            # поэтому папки обходятся параллельно в потоках:
+            with ThreadPoolExecutor(
+                max_workers=len(attachment_dirs)
+            ) as executor:
+                kept_files = list(
+                    executor.map(sweep, attachment_dirs.values())
                 )
-                continue
 
-            # Шаг 1: удалить пустые файлы
-            self._remove_empty_files(directory)
+        # Относительные пути файлов, оставшихся на диске после шагов 1-2:
+        files_on_disk: set[str] = set().union(*kept_files)
+
+        # Шаг 4: удалить записи без файлов
+        self._remove_db_records_without_files(files_on_disk)
 
-            # Шаг 2: удалить старые файлы без записи
-            self._remove_files_without_db_record(directory)
+    def _sweep_directory(
+        self, directory: Path, valid_files: frozenset[str]
+    ) -> set[str]:
+        """
+        Шаги 1-3 для одной папки (вне режима отладки выполняется в своём
+        потоке).
 
-            # Шаг 3: удалить пустые подпапки
-            self._remove_old_empty_dirs(directory)
+        Returns:
+            set: относительные пути файлов, оставшихся на диске.
+        """
+        if not directory.exists():
+            incident_logger.warning(
+                f'Папки {directory} не существует.'
+            )
+            return set()
 
-        # Шаг 4: удалить записи без файлов
-        self._remove_db_records_without_files()
+        # Один обход папки на все шаги:
+        files, dirs = self._scan_directory(directory)
 
-    def _remove_empty_files(self, directory: Path):
-        """Рекурсивно удаляет файлы с нулевым размером (0 байт)."""
-        all_dirs = [p for p in directory.rglob('*') if p.is_file()]
+        # Шаг 1: удалить пустые файлы
+        files = self._remove_empty_files(directory, files)
+
+        # Шаг 2: удалить старые файлы без записи
+        kept_files = self._remove_files_without_db_record(
+            directory, files, valid_files
+        )
+
+        # Шаг 3: удалить пустые подпапки
+        self._remove_old_empty_dirs(directory, dirs)
+
+        return kept_files
+
+    def _scan_directory(
+        self, directory: Path
+    ) -> tuple[list[os.DirEntry], list[os.DirEntry]]:
+        """
+        Собирает файлы и подпапки directory за один обход.
+
+        Returns:
+            tuple: (файлы, подпапки от самых глубоких к верхним)
+        """
+        files: list[os.DirEntry] = []
+        dirs: list[os.DirEntry] = []
 
+        for entry in scandir_recursive(str(directory)):
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(entry)
+
+        return files, dirs
+
+    def _remove_empty_files(
+        self, directory: Path, files: list[os.DirEntry]
+    ) -> list[os.DirEntry]:
+        """
+        Удаляет файлы с нулевым размером (0 байт).
+
+        Returns:
+            list: оставшиеся файлы. Результат stat кэшируется в DirEntry и
+            повторно используется на следующем шаге.
+        """
+        remaining_files: list[os.DirEntry] = []
         deleted_count = 0
-        total = len(all_dirs)
+        total = len(files)
+        progress_msg = (
+            f'Удаление файлов с нулевым размером ({directory.name}):'
+        )
 
-        for index, file_path in enumerate(all_dirs):
-            PrettyPrint.progress_bar_debug(
-                index, total,
-                f'Удаление файлов с нулевым размером ({directory.name}):'
-            )
+        for index, entry in enumerate(files):
+            PrettyPrint.progress_bar_debug(index, total, progress_msg)
 
             try:
-                if file_path.stat().st_size == 0:
-                    file_path.unlink()
+                if entry.stat(follow_symlinks=False).st_size == 0:
+                    os.unlink(entry.path)
                     deleted_count += 1
+                    continue
+            except FileNotFoundError:
+                continue
             except OSError:
                 incident_logger.warning(
-                    f'Не удалось удалить пустой файл: {file_path}'
+                    f'Не удалось удалить пустой файл: {entry.path}'
                 )
 
+            remaining_files.append(entry)
+
         if deleted_count:
             incident_logger.info(
                 f'Удалено {deleted_count} пустых файлов в {directory}'
             )
 
-    def _remove_files_without_db_record(self, directory: Path):
+        return remaining_files
+
+    @staticmethod
+    def _valid_files() -> frozenset[str]:
         """
-        Удаляет файлы с диска, если на них нет ссылки в БД и они старше порога.
+        Пути (относительно MEDIA_ROOT) всех файлов, на которые есть ссылка
+        в БД. Один запрос UNION вместо трёх, дубли убирает сама БД;
+        frozenset компактнее set и годится только для проверки in.
         """
-        threshold = timezone.now() - self.dt
-
-        valid_files = set(
-            list(EmailAttachment.objects.values_list('file_url', flat=True))
-            + list(
+        return frozenset(
+            EmailAttachment.objects.values_list('file_url', flat=True)
+            .union(
                 EmailInTextAttachment.objects
-                .values_list('file_url', flat=True)
+                .values_list('file_url', flat=True),
+                EmailMime.objects.values_list('file_url', flat=True),
             )
-            + list(EmailMime.objects.values_list('file_url', flat=True))
         )
-        all_dirs = [p for p in directory.rglob('*') if p.is_file()]
 
+    def _remove_files_without_db_record(
+        self,
+        directory: Path,
+        files: list[os.DirEntry],
+        valid_files: frozenset[str],
+    ) -> set[str]:
+        """
+        Удаляет файлы с диска, если на них нет ссылки в БД и они старше порога.
+
+        Returns:
+            set: относительные (от MEDIA_ROOT) пути оставшихся файлов.
+        """
+        # Сравниваем mtime с порогом как числа, без datetime на каждый файл:
+        threshold_ts = (timezone.now() - self.dt).timestamp()
+
+        # directory лежит внутри MEDIA_ROOT, поэтому относительный путь —
+        # это хвост entry.path после префикса:
+        media_prefix_len = len(os.path.join(settings.MEDIA_ROOT, ''))
+
+        kept_files: set[str] = set()
         deleted_count = 0
-        total = len(all_dirs)
+        total = len(files)
+        progress_msg = f'Проверка файлов без записи в базе ({directory.name}):'
 
-        for index, file_path in enumerate(all_dirs):
-            PrettyPrint.progress_bar_info(
-                index, total,
-                f'Проверка файлов без записи в базе ({directory.name}):'
-            )
+        for index, entry in enumerate(files):
+            PrettyPrint.progress_bar_info(index, total, progress_msg)
 
-            relative_path = str(file_path.relative_to(settings.MEDIA_ROOT))
+            relative_path = entry.path[media_prefix_len:]
 
             try:
-                mtime = dt.datetime.fromtimestamp(
-                    file_path.stat().st_mtime,
-                    tz=timezone.get_current_timezone()
-                )
+                mtime = entry.stat(follow_symlinks=False).st_mtime
             except OSError:
                 continue
 
             # Если нет записи в базе и файл старше threshold — удаляем
-            if relative_path not in valid_files and mtime < threshold:
+            if relative_path not in valid_files and mtime < threshold_ts:
                 try:
-                    file_path.unlink()
+                    os.unlink(entry.path)
                     deleted_count += 1
 
                 except OSError:
                     incident_logger.warning(
-                        f'Не удалось удалить файл {file_path}'
+                        f'Не удалось удалить файл {entry.path}'
                     )
+                    kept_files.add(relative_path)
+            else:
+                kept_files.add(relative_path)
 
         if deleted_count:
             incident_logger.info(
                 f'Удалено {deleted_count} файлов без записи в {directory}'
             )
 
-    def _remove_old_empty_dirs(self, directory: Path):
+        return kept_files
+
+    def _remove_old_empty_dirs(
+        self, directory: Path, dirs: list[os.DirEntry]
+    ):
         """
         Удаляет пустые папки, если их имя-дата старше threshold или не
         соответствует формату.
-        """
-        threshold = timezone.now() - self.dt
 
-        all_dirs = [p for p in directory.rglob('*') if p.is_dir()]
-        all_dirs.sort(key=lambda p: -len(p.parts))
+        dirs идут от самых глубоких к верхним, поэтому родитель проверяется
+        уже после удаления своих пустых подпапок. Пустота проверяется самим
+        rmdir — одним системным вызовом на папку.
+        """
+        # Имена папок — локальные даты, поэтому сравниваем с наивным
+        # локальным порогом, без make_aware на каждую папку:
+        threshold = timezone.localtime(
+            timezone.now() - self.dt
+        ).replace(tzinfo=None)
 
-        total = len(all_dirs)
+        total = len(dirs)
         deleted_count = 0
+        progress_msg = f'Удаление пустых подпапок ({directory.name}):'
 
-        for index, dir_path in enumerate(all_dirs):
-            PrettyPrint.progress_bar_error(
-                index, total, f'Удаление пустых подпапок ({directory.name}):'
-            )
+        for index, entry in enumerate(dirs):
+            PrettyPrint.progress_bar_error(index, total, progress_msg)
+
+            folder_name = entry.name
+            folder_date = None
+            # Для имён не в формате даты strptime не вызываем вовсе:
+            if SUBFOLDER_DATE_RE.fullmatch(folder_name):
+                try:
+                    folder_date = dt.datetime.strptime(
+                        folder_name, SUBFOLDER_DATE_FORMAT
+                    )
+                except ValueError:
+                    pass
+
+            if folder_date is not None and folder_date >= threshold:
+                continue
 
+            # rmdir сам отказывает для непустой папки (ENOTEMPTY), поэтому
+            # отдельно открывать и читать папку не нужно:
             try:
-                if not any(dir_path.iterdir()):
-                    folder_name = dir_path.name
-                    try:
-                        folder_date = timezone.make_aware(
-                            dt.datetime.strptime(
-                                folder_name, SUBFOLDER_DATE_FORMAT
-                            ),
-                            timezone.get_current_timezone()
-                        )
-                    except ValueError:
-                        folder_date = None
-
-                    if (
-                        folder_date is None
-                        or folder_date < threshold
-                    ):
-                        dir_path.rmdir()
-                        deleted_count += 1
+                os.rmdir(entry.path)
+                deleted_count += 1
 
-            except OSError:
+            except FileNotFoundError:
+                continue
+
+            except OSError as e:
+                if e.errno in (errno.ENOTEMPTY, errno.EEXIST):
+                    continue
                 incident_logger.warning(
-                    f'Не удалось удалить папку {dir_path}'
+                    f'Не удалось удалить папку {entry.path}'
                 )
 
         if deleted_count:
@@ -169,10 +287,18 @@ class Command(BaseCommand):
                 f'Удалено {deleted_count} пустых подпапок в {directory}'
             )
 
-    def _remove_db_records_without_files(self):
+    def _remove_db_records_without_files(self, files_on_disk: set[str]):
         """
         Удаляет записи из базы данных, если физический файл на диске
         отсутствует и запись создана более threshold.
+
+        Наличие файла проверяется по множеству files_on_disk, собранному
+        при обходе папок, без stat на каждую запись. Файл мог появиться
+        уже после обхода, поэтому перед удалением записи отсутствие файла
+        подтверждается на диске — но только для немногих кандидатов.
+
+        Таблицы моделей не зависят друг от друга, поэтому вне режима
+        отладки проверяются параллельно в потоках.
         """
         threshold = timezone.now() - self.dt
 
@@ -180,41 +306,75 @@ class Command(BaseCommand):
             EmailAttachment, EmailInTextAttachment, EmailMime
         ]
 
-        for model in models:
+        tasks = [
+            partial(
+                self._remove_model_records_without_files,
+                model,
+                files_on_disk,
+                threshold,
+            )
+            for model in models
+        ]
+
+        if DEBUG_MODE:
+            # Как и обход папок: прогресс-бары рисуются только из основного
+            # потока, поэтому в режиме отладки таблицы проверяются по очереди:
+            for task in tasks:
+                task()
+        else:
+            tasks_in_threads(tasks, incident_logger, cpu_bound=False)
+
+    def _remove_model_records_without_files(
+        self,
+        model: EmailAttachment | EmailInTextAttachment | EmailMime,
+        files_on_disk: set[str],
+        threshold: dt.datetime,
+    ):
+        """Удаляет записи model без файлов (вне режима отладки в потоке)."""
+        media_root = settings.MEDIA_ROOT
+
+        try:
             qs = model.objects.filter(email_msg__email_date__lt=threshold)
 
+            # Записи без пути к файлу удаляются одним вызовом delete():
+            deleted_count, _ = (
+                qs.filter(Q(file_url__isnull=True) | Q(file_url='')).delete()
+            )
+
             total = qs.count()
             to_delete_ids: list[int] = []
-            deleted_count = 0
+            progress_msg = f'Проверка записей без файлов ({model.__name__}):'
 
-            for index, attachment in enumerate(
-                qs.iterator(chunk_size=EMAILS_FILES_2_DEL_BATCH_SIZE)
+            # Модели не создаются — нужны только id и путь к файлу:
+            for index, (attachment_id, file_url) in enumerate(
+                qs.values_list('id', 'file_url')
+                .iterator(chunk_size=EMAILS_FILES_2_DEL_BATCH_SIZE)
             ):
-                PrettyPrint.progress_bar_warning(
-                    index,
-                    total,
-                    f'Проверка записей без файлов ({model.__name__}):'
-                )
+                PrettyPrint.progress_bar_warning(index, total, progress_msg)
 
-                file_path = (
-                    Path(settings.MEDIA_ROOT) / attachment.file_url.name
-                )
-
-                if not file_path.exists():
-                    to_delete_ids.append(attachment.id)
+                if not file_url or (
+                    file_url not in files_on_disk
+                    and not os.path.exists(
+                        os.path.join(media_root, file_url)
+                    )
+                ):
+                    to_delete_ids.append(attachment_id)
                     deleted_count += 1
 
                 # удаляем батч
                 if len(to_delete_ids) >= EMAILS_FILES_2_DEL_BATCH_SIZE:
-                    model.objects.filter(id__in=to_delete_ids).delete()
+                    model._base_manager.filter(id__in=to_delete_ids).delete()
                     to_delete_ids.clear()
 
             # удалить хвост
             if to_delete_ids:
-                model.objects.filter(id__in=to_delete_ids).delete()
+                model._base_manager.filter(id__in=to_delete_ids).delete()
 
             if deleted_count:
                 incident_logger.info(
                     f'Удалено {deleted_count} записей без файлов для '
                     f'{model.__name__}'
                 )
+        finally:
+            # У каждого потока своё соединение с БД — закрываем его:
+            connection.close()
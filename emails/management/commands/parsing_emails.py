@@ -1,4 +1,6 @@
 import imaplib
+import random
+import ssl
 import time
 
 from django.core.management.base import (
@@ -9,6 +11,12 @@ from django.core.management.base import (
 
 from core.constants import MIN_WAIT_SEC_WITH_CRITICAL_EXC
 from core.loggers import email_parser_logger
+from emails.constants import (
+    EMAIL_IMAP_RECONNECT_BASE_DELAY,
+    EMAIL_IMAP_RECONNECT_JITTER,
+    EMAIL_IMAP_RECONNECT_MAX_DELAY,
+    EMAIL_PARSER_CRITICAL_MAX_DELAY,
+)
 from emails.email_parser import email_parser
 
 
@@ -18,7 +26,6 @@ class Command(BaseCommand):
         'inbox': email_parser.inbox_folder_name,
         'sent': email_parser.sent_folder_name,
     }
-    conn_timeout = 600
 
     def add_arguments(self, parser: CommandParser):
         parser.add_argument(
@@ -31,32 +38,6 @@ class Command(BaseCommand):
             ),
         )
 
-    def create_mail_connection(self, mailbox_name: str) -> imaplib.IMAP4_SSL:
-        """Создает новое соединение, логинится и выбирает папку."""
-        mail = None
-        try:
-            mail = imaplib.IMAP4_SSL(
-                email_parser.email_server,
-                email_parser.email_port,
-                timeout=self.conn_timeout,
-            )
-            mail.login(email_parser.email_login, email_parser.email_pswd)
-            mail.select(mailbox_name, readonly=True)
-
-            email_parser_logger.debug(
-                f'Успешное подключение к папке {mailbox_name}'
-            )
-            return mail
-        except Exception as e:
-            email_parser_logger.error(f'Ошибка при создании соединения: {e}')
-            if mail:
-                try:
-                    mail.close()
-                    mail.logout()
-                except Exception:
-                    pass
-            raise
-
     def handle(self, *args, **kwargs):
         mailbox = (kwargs.get('mailbox') or '').strip().lower()
 
@@ -69,68 +50,94 @@ class Command(BaseCommand):
             raise CommandError(err_msg)
 
         mailbox_name = self.mailbox_map[mailbox]
-        mail = None
+
+        # Соединение живёт между прогонами (get_mail), поэтому LOGOUT
+        # выполняется при любом выходе, в том числе по Ctrl+C во время
+        # подключения или паузы:
+        try:
+            self._parse_forever(mailbox_name)
+        except KeyboardInterrupt:
+            return
+        finally:
+            email_parser.close_mail()
+
+    def _parse_forever(self, mailbox_name: str):
+        """Бесконечный цикл парсинга папки с переподключением при ошибках."""
+        # Сколько раз подряд прогон завершился ошибкой:
+        failures = 0
 
         while True:
 
-            if mail is None:
-                try:
-                    mail = self.create_mail_connection(mailbox_name)
-                except Exception as conn_err:
-                    email_parser_logger.exception(
-                        f'Не удалось создать соединение: {conn_err}'
-                    )
-                    time.sleep(MIN_WAIT_SEC_WITH_CRITICAL_EXC)
-                    continue
+            try:
+                mail = email_parser.get_mail(mailbox_name)
+            except Exception as conn_err:
+                email_parser_logger.exception(
+                    f'Не удалось создать соединение: {conn_err}'
+                )
+                failures += 1
+                self._reconnect_delay(
+                    failures,
+                    MIN_WAIT_SEC_WITH_CRITICAL_EXC,
+                    EMAIL_PARSER_CRITICAL_MAX_DELAY,
+                )
+                continue
 
             try:
                 email_parser.fetch_unread_emails(
                     mail=mail,
                     mailbox=mailbox_name,
                 )
+                failures = 0
 
-            except KeyboardInterrupt:
-                return
+                # Вместо немедленного повторного прогона ждём, пока сервер
+                # сообщит о новых письмах:
+                email_parser.wait_new_emails(mail)
 
             except TimeoutError:
                 email_parser_logger.warning('Таймаут парсинга писем.')
-
-                if mail:
-                    try:
-                        mail.close()
-                        mail.logout()
-                    except Exception:
-                        pass
-
-                mail = None
+                email_parser.close_mail()
+                failures += 1
+                self._reconnect_delay(failures)
 
             except (
-                imaplib.IMAP4.abort, imaplib.IMAP4.error, ConnectionResetError
+                imaplib.IMAP4.abort,
+                imaplib.IMAP4.error,
+                ConnectionResetError,
+                ssl.SSLEOFError,
             ) as e:
                 email_parser_logger.error(
                     f'Ошибка соединения с сервером почты: {e}.'
                 )
-
-                if mail:
-                    try:
-                        mail.close()
-                        mail.logout()
-                    except Exception:
-                        pass
-
-                mail = None
+                email_parser.close_mail()
+                failures += 1
+                self._reconnect_delay(failures)
 
             except Exception as e:
                 email_parser_logger.exception(
                     f'Критическая ошибка парсинга почты: {e}'
                 )
+                email_parser.close_mail()
+                failures += 1
 
-                if mail:
-                    try:
-                        mail.close()
-                        mail.logout()
-                    except Exception:
-                        pass
+                self._reconnect_delay(
+                    failures,
+                    MIN_WAIT_SEC_WITH_CRITICAL_EXC,
+                    EMAIL_PARSER_CRITICAL_MAX_DELAY,
+                )
 
-                time.sleep(MIN_WAIT_SEC_WITH_CRITICAL_EXC)
-                mail = None
+    @staticmethod
+    def _reconnect_delay(
+        failures: int,
+        base_delay: float = EMAIL_IMAP_RECONNECT_BASE_DELAY,
+        max_delay: float = EMAIL_IMAP_RECONNECT_MAX_DELAY,
+    ):
+        """
+        Пауза перед переподключением, чтобы при недоступном сервере не
+        переподключаться к нему в цикле с постоянной частотой: удваивается
+        с каждой ошибкой подряд (от base_delay до max_delay) и
+        увеличивается на случайную долю до EMAIL_IMAP_RECONNECT_JITTER.
+        """
+        delay = min(base_delay * 2 ** (failures - 1), max_delay)
+        time.sleep(
+            delay + random.uniform(0, delay * EMAIL_IMAP_RECONNECT_JITTER)
+        )
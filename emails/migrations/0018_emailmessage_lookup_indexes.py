@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-17 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0057_incidenttype_sla_deadline_positive'),
+        ('emails', '0017_emailmessage_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailmessage',
+            name='email_subject',
+            field=models.CharField(blank=True, max_length=1024, null=True, verbose_name='Тема письма'),
+        ),
+        migrations.AlterField(
+            model_name='emailmessage',
+            name='email_incident',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='email_messages', to='incidents.incident', verbose_name='Номер инцидента'),
+        ),
+        migrations.AddIndex(
+            model_name='emailmessage',
+            index=models.Index(fields=['email_incident', 'email_date'], name='em_incident_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailmessage',
+            index=models.Index(condition=models.Q(('is_email_from_yandex_tracker', False), ('was_added_2_yandex_tracker', False)), fields=['email_date'], name='em_unsent_date_idx'),
+        ),
+    ]
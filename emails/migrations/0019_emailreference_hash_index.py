@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-17 11:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0018_emailmessage_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailreference',
+            name='email_msg_references',
+            field=models.CharField(max_length=256, verbose_name='Ссылка на другие сообщения'),
+        ),
+        migrations.AddIndex(
+            model_name='emailreference',
+            index=django.contrib.postgres.indexes.HashIndex(fields=['email_msg_references'], name='email_ref_msg_id_hash_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import re
+from typing import Optional
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import HashIndex
 from django.core.exceptions import ValidationError
 from django.db import models
 
@@ -41,6 +43,9 @@ class EmailErr(SpecialEmail):
 class EmailFolder(Detail):
     """Модель для папок писем"""
 
+    # id папки INBOX, кешируется на процесс (см. get_inbox_id):
+    _inbox_id: Optional[int] = None
+
     class Meta:
         verbose_name = 'папка писем'
         verbose_name_plural = 'Папки писем'
@@ -58,7 +63,19 @@ class EmailFolder(Detail):
 
     @staticmethod
     def get_inbox_id():
-        return EmailFolder.get_inbox().id
+        """
+        id папки INBOX. Это default поля folder у каждого нового письма,
+        поэтому get_or_create выполняется один раз на процесс, а не при
+        создании каждого объекта EmailMessage.
+        """
+        if EmailFolder._inbox_id is None:
+            EmailFolder._inbox_id = EmailFolder.get_inbox().id
+        return EmailFolder._inbox_id
+
+    @staticmethod
+    def reset_inbox_id():
+        """Сбрасывает кеш get_inbox_id."""
+        EmailFolder._inbox_id = None
 
 
 class EmailMessage(models.Model):
@@ -82,7 +99,6 @@ class EmailMessage(models.Model):
         null=True,
         blank=True,
         verbose_name='Тема письма',
-        db_index=True
     )
     email_from = models.EmailField(
         max_length=MAX_EMAIL_LEN,
@@ -131,7 +147,8 @@ class EmailMessage(models.Model):
         blank=True,
         related_name='email_messages',
         verbose_name='Номер инцидента',
-        db_index=True
+        # Индекс по инциденту покрывает составной em_incident_date_idx:
+        db_index=False
     )
     folder = models.ForeignKey(
         EmailFolder,
@@ -152,6 +169,22 @@ class EmailMessage(models.Model):
     class Meta:
         verbose_name = 'сообщение'
         verbose_name_plural = 'Почта'
+        indexes = [
+            # Письма инцидента выбираются отсортированными по дате:
+            models.Index(
+                fields=['email_incident', 'email_date'],
+                name='em_incident_date_idx',
+            ),
+            # Письма, ещё не добавленные в YandexTracker:
+            models.Index(
+                fields=['email_date'],
+                name='em_unsent_date_idx',
+                condition=models.Q(
+                    was_added_2_yandex_tracker=False,
+                    is_email_from_yandex_tracker=False,
+                ),
+            ),
+        ]
 
     def __str__(self):
         safe_email_subject = truncate_text(
@@ -166,7 +199,6 @@ class EmailReference(models.Model):
         max_length=MAX_EMAIL_ID_LEN,
         null=False,
         verbose_name='Ссылка на другие сообщения',
-        db_index=True
     )
     email_msg = models.ForeignKey(
         EmailMessage,
@@ -183,6 +215,14 @@ class EmailReference(models.Model):
                 name='unique_email_reference'
             )
         ]
+        indexes = [
+            # Message-ID сравниваются только на равенство: hash индекс
+            # меньше B-tree и не требует отдельного индекса для LIKE.
+            HashIndex(
+                fields=['email_msg_references'],
+                name='email_ref_msg_id_hash_idx',
+            ),
+        ]
         verbose_name = 'ссылка на email'
         verbose_name_plural = 'Ссылки на email'
 
@@ -0,0 +1,68 @@
+"""
+Процессы-обработчики для разбора писем (EmailParser._parse_emails).
+
+Процессы запускаются методом spawn, а не fork: к моменту разбора у
+процесса парсера открыто IMAP соединение, клиенты кеша и могут работать
+потоки, а fork такого процесса небезопасен. Поэтому модуль при загрузке
+не импортирует ни модели, ни парсер: дочерний процесс настраивает Django
+в init_worker и только после этого импортирует парсер.
+"""
+import logging
+from logging.handlers import QueueHandler
+from multiprocessing import Queue
+from typing import Optional
+
+import django
+
+_email_parser = None
+
+
+class ParentLogHandler(logging.Handler):
+    """
+    Передаёт запись из процесса-обработчика логгеру с тем же именем в
+    основном процессе (используется в QueueListener).
+    """
+
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+def init_worker(log_queue: Queue):
+    """
+    Настраивает Django в процессе-обработчике.
+
+    Записи всех логгеров процесса отправляются в log_queue и пишутся в
+    файлы основным процессом: иначе несколько процессов писали бы в одни
+    и те же RotatingFileHandler и ротация могла бы выполняться
+    одновременно.
+    """
+    global _email_parser
+
+    django.setup()
+
+    from emails.email_parser import email_parser
+
+    queue_handler = QueueHandler(log_queue)
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values()
+        if isinstance(logger, logging.Logger)
+    ]
+
+    for logger in loggers:
+        if not logger.handlers:
+            continue
+
+        for handler in logger.handlers:
+            handler.close()
+
+        logger.handlers.clear()
+        logger.addHandler(queue_handler)
+
+    _email_parser = email_parser
+
+
+def parse_email(
+    msg_bytes: bytes,
+) -> tuple[Optional[str], Optional[dict], bool]:
+    """Точка входа для ProcessPoolExecutor (функция должна быть picklable)."""
+    return _email_parser._parse_email(msg_bytes)
@@ -0,0 +1,30 @@
+from django.db.models import Prefetch, QuerySet
+
+from emails.models import EmailMessage
+
+
+class EmailSelector:
+
+    @staticmethod
+    def emails_with_children() -> QuerySet[EmailMessage]:
+        """
+        Письма вместе со всеми данными, которые выводятся в шаблонах:
+        папка, инцидент и MIME одним JOIN, а вложения и получатели
+        отдельными запросами prefetch_related. Число запросов не зависит
+        от количества писем.
+        """
+        return (
+            EmailMessage.objects
+            .select_related('email_incident', 'folder', 'email_mime')
+            .prefetch_related(
+                Prefetch(
+                    'email_attachments', to_attr='prefetched_attachments'
+                ),
+                Prefetch(
+                    'email_intext_attachments',
+                    to_attr='prefetched_intext_attachments'
+                ),
+                Prefetch('email_msg_to', to_attr='prefetched_to'),
+                Prefetch('email_msg_cc', to_attr='prefetched_cc'),
+            )
+        )
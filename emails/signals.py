@@ -1,11 +1,11 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_migrate, pre_save
 from django.dispatch import receiver
 
 from emails.services.turn_off_incident_auto_close import (
     turn_off_incident_auto_close,
 )
 
-from .models import EmailMessage
+from .models import EmailFolder, EmailMessage
 
 
 @receiver(pre_save, sender=EmailMessage)
@@ -20,3 +20,13 @@ def cancel_auto_close_on_new_email(
         return
 
     turn_off_incident_auto_close(instance)
+
+
+@receiver(post_delete, sender=EmailFolder)
+@receiver(post_migrate)
+def reset_inbox_id_cache(sender, **kwargs):
+    """
+    Сбрасывает кешированный id папки INBOX, если папка могла быть удалена
+    или пересоздана (удаление папки, миграции и очистка тестовой БД).
+    """
+    EmailFolder.reset_inbox_id()
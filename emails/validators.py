@@ -1,11 +1,13 @@
+import binascii
 import os
 import re
 import unicodedata
 from datetime import datetime
 from email import header, message
 from email.header import decode_header
-from email.utils import getaddresses, parseaddr
-from typing import Optional
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from functools import lru_cache
+from typing import BinaryIO, Optional
 
 import html2text
 from bs4 import BeautifulSoup, Comment, NavigableString, Tag
@@ -18,19 +20,33 @@ from core.loggers import email_parser_logger
 from .constants import (
     ALLOWED_EXTENSIONS,
     ALLOWED_MIME_PREFIXES,
+    ATTACHMENT_DECODE_CHUNK_SIZE,
     EMAIL_RE,
     MAX_DOWNLOAD_ATTACHMENT_SIZE,
     MAX_EMAIL_LEN,
+    MSG_ID_CACHE_SIZE,
 )
 
 
 class EmailValidator:
 
     def prepare_msg_id(self, msg_id: str) -> str:
+        # Одни и те же ID повторяются в References и In-Reply-To писем
+        # одной переписки, поэтому строки нормализуются через кэш:
+        if isinstance(msg_id, str):
+            return self._prepare_msg_id_cached(msg_id)
+
         msg_id = msg_id.strip()
         return self.prepare_text_from_encode(msg_id).split(' ')[-1]
 
-    def prepare_text_from_encode(self, original_text: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=MSG_ID_CACHE_SIZE)
+    def _prepare_msg_id_cached(msg_id: str) -> str:
+        msg_id = msg_id.strip()
+        return EmailValidator.prepare_text_from_encode(msg_id).split(' ')[-1]
+
+    @staticmethod
+    def prepare_text_from_encode(original_text: str) -> str:
         decoded_words = header.decode_header(original_text)
         email_filename = ''.join(
             str(
@@ -53,6 +69,26 @@ class EmailValidator:
             return email_subject
         return subject
 
+    def prepare_email_date(self, raw_date: str) -> datetime:
+        """
+        Разбирает заголовок Date по RFC 2822. Для нестандартных значений
+        используются прежние форматы strptime.
+        """
+        try:
+            return parsedate_to_datetime(raw_date)
+        except (TypeError, ValueError):
+            pass
+
+        cleaned_date_string = raw_date.split(' (')[0]
+        try:
+            return datetime.strptime(
+                cleaned_date_string, '%a, %d %b %Y %H:%M:%S %z'
+            )
+        except ValueError:
+            return datetime.strptime(
+                cleaned_date_string, '%d %b %Y %H:%M:%S %z'
+            )
+
     def prepare_email_from(self, email_from_original: header.Header) -> str:
         raw_value = str(email_from_original)
 
@@ -284,19 +320,146 @@ class EmailValidator:
             .strip()
         )
 
+    @staticmethod
+    def email_attachments_dir(email_date: datetime) -> str:
+        """Папка для вложений писем за дату email_date."""
+        return os.path.join(
+            INCIDENT_DIR, email_date.strftime(SUBFOLDER_DATE_FORMAT)
+        )
+
+    @staticmethod
+    def _min_decoded_size(part: message.Message) -> int:
+        """
+        Нижняя оценка размера вложения без декодирования base64.
+
+        Каждые 4 символа base64 (без переносов строк) дают 3 байта, на
+        паддинг приходится не больше 2 байт. Для остальных кодировок
+        оценка не делается (0).
+        """
+        if part.get('Content-Transfer-Encoding', '').strip().lower() != (
+            'base64'
+        ):
+            return 0
+        raw = part.get_payload()
+        if not isinstance(raw, str):
+            return 0
+        chars = len(raw) - raw.count('\n') - raw.count('\r')
+        return max(chars * 3 // 4 - 2, 0)
+
+    @staticmethod
+    def _is_base64_part(part: message.Message) -> bool:
+        return (
+            not part.is_multipart()
+            and part.get_content_type() != 'message/rfc822'
+            and part.get('Content-Transfer-Encoding', '').strip().lower()
+            == 'base64'
+            and isinstance(part.get_payload(), str)
+        )
+
+    @staticmethod
+    def _decode_base64_to_file(raw: str, f: BinaryIO, filename: str) -> int:
+        """
+        Декодирует base64 строку raw в файл f частями по
+        ATTACHMENT_DECODE_CHUNK_SIZE символов.
+
+        Returns:
+            int: размер записанного файла.
+
+        Raises:
+            ValidationError: файл превышает MAX_DOWNLOAD_ATTACHMENT_SIZE.
+        """
+        file_size = 0
+        tail = ''
+
+        for start in range(0, len(raw), ATTACHMENT_DECODE_CHUNK_SIZE):
+            chunk = tail + ''.join(
+                raw[start:start + ATTACHMENT_DECODE_CHUNK_SIZE].split()
+            )
+            # Декодируем только полные группы по 4 символа, остаток
+            # переносится в следующую часть:
+            cut = len(chunk) - len(chunk) % 4
+            chunk, tail = chunk[:cut], chunk[cut:]
+            if not chunk:
+                continue
+
+            data = binascii.a2b_base64(chunk)
+            file_size += len(data)
+            if file_size > MAX_DOWNLOAD_ATTACHMENT_SIZE:
+                raise ValidationError(
+                    f'Файл {filename} превышает max размер '
+                    f'{MAX_DOWNLOAD_ATTACHMENT_SIZE / (1024 * 1024):.1f} MB'
+                )
+            f.write(data)
+
+        if tail.rstrip('='):
+            # Как и email.message, дополняем неполную последнюю группу:
+            data = binascii.a2b_base64(tail + '=' * (-len(tail) % 4))
+            file_size += len(data)
+            f.write(data)
+
+        return file_size
+
     def save_email_attachments(
         self,
         email_date: datetime,
         filename: str,
-        part: message.Message
+        part: message.Message,
+        file_dir: Optional[str] = None,
     ):
         """
         Сохранение вложений из почты, с проверкой типов файлов.
 
+        Тип файла и нижняя оценка размера проверяются до декодирования
+        содержимого, чтобы не раскодировать base64 вложений, которые всё
+        равно будут отброшены. Вложения в base64 декодируются в файл
+        частями (_decode_base64_to_file).
+
+        Args:
+            file_dir (str, optional): папка, заранее вычисленная через
+                email_attachments_dir для всех частей одного письма.
+
         Raises:
             ValidationError: не допустимый тип файла.
         """
         content_type = part.get_content_type()
+        ext = os.path.splitext(filename)[1].lower()
+
+        if not any(
+            content_type.startswith(prefix) for prefix in ALLOWED_MIME_PREFIXES
+        ) and ext not in ALLOWED_EXTENSIONS:
+            raise ValidationError(
+                f'Недопустимый тип файла {filename} ({content_type})'
+            )
+
+        if self._min_decoded_size(part) > MAX_DOWNLOAD_ATTACHMENT_SIZE:
+            raise ValidationError(
+                f'Файл {filename} превышает max размер '
+                f'{MAX_DOWNLOAD_ATTACHMENT_SIZE / (1024 * 1024):.1f} MB'
+            )
+
+        if file_dir is None:
+            file_dir = self.email_attachments_dir(email_date)
+        os.makedirs(file_dir, exist_ok=True)
+        filepath = os.path.join(file_dir, filename)
+
+        if self._is_base64_part(part):
+            # base64 декодируется частями сразу в файл, без промежуточного
+            # bytes со всем содержимым вложения:
+            try:
+                with open(filepath, 'wb') as f:
+                    self._decode_base64_to_file(
+                        part.get_payload(), f, filename
+                    )
+            except ValidationError:
+                os.remove(filepath)
+                raise
+            except binascii.Error as e:
+                os.remove(filepath)
+                raise ValidationError(
+                    f'Не удалось извлечь содержимое файла {filename} '
+                    f'({content_type})'
+                ) from e
+            return
 
         if content_type == 'message/rfc822':
             inner = part.get_payload()[0] if isinstance(
@@ -313,14 +476,6 @@ class EmailValidator:
             )
 
         file_size = len(payload)
-        ext = os.path.splitext(filename)[1].lower()
-
-        if not any(
-            content_type.startswith(prefix) for prefix in ALLOWED_MIME_PREFIXES
-        ) and ext not in ALLOWED_EXTENSIONS:
-            raise ValidationError(
-                f'Недопустимый тип файла {filename} ({content_type})'
-            )
 
         if file_size > MAX_DOWNLOAD_ATTACHMENT_SIZE:
             raise ValidationError(
@@ -328,11 +483,5 @@ class EmailValidator:
                 f'{MAX_DOWNLOAD_ATTACHMENT_SIZE / (1024 * 1024):.1f} MB'
             )
 
-        file_dir: str = os.path.join(
-            INCIDENT_DIR,
-            email_date.strftime(SUBFOLDER_DATE_FORMAT)
-        )
-        os.makedirs(file_dir, exist_ok=True)
-        filepath = os.path.join(file_dir, filename)
         with open(filepath, 'wb') as f:
             f.write(payload)
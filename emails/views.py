@@ -7,7 +7,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db.models import Prefetch, Q
+from django.db.models import Q
 from django.http import (
     Http404,
     HttpRequest,
@@ -37,6 +37,7 @@ from .models import (
     EmailInTextAttachment,
     EmailMessage,
 )
+from .selectors.emails import EmailSelector
 
 
 @login_required
@@ -146,23 +147,8 @@ def emails_list(request: HttpRequest) -> HttpResponse:
     page_obj = paginator.get_page(page_number)
     page_ids = list(page_obj.object_list)
 
-    emails_qs = EmailMessage.objects.filter(id__in=page_ids).select_related(
-        'email_incident',
-        'folder',
-        'email_mime',
-    ).prefetch_related(
-        Prefetch(
-            'email_attachments', to_attr='prefetched_attachments'
-        ),
-        Prefetch(
-            'email_intext_attachments', to_attr='prefetched_intext_attachments'
-        ),
-        Prefetch(
-            'email_msg_to', to_attr='prefetched_to'
-        ),
-        Prefetch(
-            'email_msg_cc', to_attr='prefetched_cc'
-        ),
+    emails_qs = EmailSelector.emails_with_children().filter(
+        id__in=page_ids
     )
     id_index = {id_: i for i, id_ in enumerate(page_ids)}
     emails = sorted(emails_qs, key=lambda n: id_index[n.id])
@@ -200,24 +186,7 @@ def emails_list(request: HttpRequest) -> HttpResponse:
 @role_required()
 @ratelimit(key='user_or_ip', rate='200/m', block=True)
 def email_detail(request: HttpRequest, email_id: int) -> HttpResponse:
-    email_qs = EmailMessage.objects.filter(id=email_id).select_related(
-        'email_incident',
-        'folder',
-        'email_mime',
-    ).prefetch_related(
-        Prefetch(
-            'email_attachments', to_attr='prefetched_attachments'
-        ),
-        Prefetch(
-            'email_intext_attachments', to_attr='prefetched_intext_attachments'
-        ),
-        Prefetch(
-            'email_msg_to', to_attr='prefetched_to'
-        ),
-        Prefetch(
-            'email_msg_cc', to_attr='prefetched_cc'
-        ),
-    )
+    email_qs = EmailSelector.emails_with_children().filter(id=email_id)
 
     user: User = request.user
     if user.role == Roles.AVR_CONTRACTOR:
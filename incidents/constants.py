@@ -101,14 +101,23 @@ TOTAL_CATEGORIES = [AVR_CATEGORY, RVR_CATEGORY, DGU_CATEGORY, EKS_CATEGORY]
 
 # Дедлайн SLA РВР:
 RVR_SLA_DEADLINE_IN_HOURS = 72
+RVR_SLA_DEADLINE = timedelta(hours=RVR_SLA_DEADLINE_IN_HOURS)
 
 # Дедлайн SLA ДГУ:
 DGU_SLA_IN_PROGRESS_DEADLINE_IN_HOURS = 12
 DGU_SLA_WAITING_DEADLINE_IN_HOURS = 24 * 15
+DGU_SLA_IN_PROGRESS_DEADLINE = timedelta(
+    hours=DGU_SLA_IN_PROGRESS_DEADLINE_IN_HOURS
+)
+DGU_SLA_WAITING_DEADLINE = timedelta(hours=DGU_SLA_WAITING_DEADLINE_IN_HOURS)
 
 # Дедлайн SLA ЭКС:
 EKS_SLA_IN_PROGRESS_DEADLINE_IN_HOURS = 12
 EKS_SLA_WAITING_DEADLINE_IN_HOURS = 24 * 15
+EKS_SLA_IN_PROGRESS_DEADLINE = timedelta(
+    hours=EKS_SLA_IN_PROGRESS_DEADLINE_IN_HOURS
+)
+EKS_SLA_WAITING_DEADLINE = timedelta(hours=EKS_SLA_WAITING_DEADLINE_IN_HOURS)
 
 # Дедлайн диспетчеров:
 DISPATCH_SLA_DEADLINE = timedelta(minutes=10)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0056_alter_comment_content'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='incidenttype',
+            constraint=models.CheckConstraint(check=models.Q(('sla_deadline__gt', 0), ('sla_deadline__isnull', True), _connector='OR'), name='sla_deadline_positive'),
+        ),
+    ]
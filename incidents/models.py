@@ -20,17 +20,18 @@ from users.models import User
 from .constants import (
     AVR_CATEGORY,
     DEFAULT_IS_YT_TRACKER_CONTROLLED,
+    DGU_SLA_IN_PROGRESS_DEADLINE,
     DGU_SLA_IN_PROGRESS_DEADLINE_IN_HOURS,
-    DGU_SLA_WAITING_DEADLINE_IN_HOURS,
-    EKS_SLA_IN_PROGRESS_DEADLINE_IN_HOURS,
-    EKS_SLA_WAITING_DEADLINE_IN_HOURS,
+    DGU_SLA_WAITING_DEADLINE,
+    EKS_SLA_IN_PROGRESS_DEADLINE,
+    EKS_SLA_WAITING_DEADLINE,
     INCIDENT_CODE_PREFIX,
     INCIDENT_COMMENT_MAX_PREVIEW_LEN,
     MAX_CODE_LEN,
     MAX_COMMENT_TEXT_LEN,
     MAX_FUTURE_END_DELTA,
     MAX_STATUS_COMMENT_LEN,
-    RVR_SLA_DEADLINE_IN_HOURS,
+    RVR_SLA_DEADLINE,
 )
 
 
@@ -485,30 +486,18 @@ class Incident(models.Model):
 
     @property
     def is_sla_avr_expired(self) -> Optional[bool]:
-        is_expired = None
-        if (
-            self.incident_type
-            and self.incident_type.sla_deadline
-            and self.avr_start_date
-        ):
-            check_date = self.avr_end_date or timezone.now()
-            sla_deadline = self.avr_start_date + timedelta(
-                minutes=self.incident_type.sla_deadline
-            )
-            is_expired = sla_deadline < check_date
-        return is_expired
+        sla_deadline = self.sla_avr_deadline
+        if sla_deadline is None:
+            return None
+        return sla_deadline < (self.avr_end_date or timezone.now())
     is_sla_avr_expired.fget.short_description = 'Просрочен ли SLA (АВР)'
 
     @property
     def is_sla_rvr_expired(self) -> Optional[bool]:
-        is_expired = None
-        if self.rvr_start_date:
-            check_date = self.rvr_end_date or timezone.now()
-            sla_deadline = self.rvr_start_date + timedelta(
-                hours=RVR_SLA_DEADLINE_IN_HOURS
-            )
-            is_expired = sla_deadline < check_date
-        return is_expired
+        sla_deadline = self.sla_rvr_deadline
+        if sla_deadline is None:
+            return None
+        return sla_deadline < (self.rvr_end_date or timezone.now())
     is_sla_rvr_expired.fget.short_description = 'Просрочен ли SLA (РВР)'
 
     @property
@@ -519,9 +508,7 @@ class Incident(models.Model):
         end_date = self.dgu_end_date or timezone.now()
         elapsed = end_date - self.dgu_start_date
 
-        return elapsed > timedelta(
-            hours=DGU_SLA_WAITING_DEADLINE_IN_HOURS
-        )
+        return elapsed > DGU_SLA_WAITING_DEADLINE
     is_sla_dgu_expired.fget.short_description = 'Просрочен ли SLA (ДГУ)'
 
     @property
@@ -532,9 +519,7 @@ class Incident(models.Model):
         end_date = self.eks_end_date or timezone.now()
         elapsed = end_date - self.eks_start_date
 
-        return elapsed > timedelta(
-            hours=EKS_SLA_WAITING_DEADLINE_IN_HOURS
-        )
+        return elapsed > EKS_SLA_WAITING_DEADLINE
     is_sla_eks_expired.fget.short_description = 'Просрочен ли SLA (ЭКС)'
 
     @property
@@ -544,13 +529,13 @@ class Incident(models.Model):
 
     @property
     def sla_avr_deadline(self) -> Optional[datetime]:
-        if (
-            self.incident_type
-            and self.incident_type.sla_deadline
-            and self.avr_start_date
-        ):
+        if not self.avr_start_date:
+            return None
+
+        incident_type = self.incident_type
+        if incident_type and incident_type.sla_deadline:
             return self.avr_start_date + timedelta(
-                minutes=self.incident_type.sla_deadline
+                minutes=incident_type.sla_deadline
             )
         return None
     sla_avr_deadline.fget.short_description = 'Срок устранения АВР'
@@ -558,27 +543,21 @@ class Incident(models.Model):
     @property
     def sla_rvr_deadline(self) -> Optional[datetime]:
         if self.rvr_start_date:
-            return self.rvr_start_date + timedelta(
-                hours=RVR_SLA_DEADLINE_IN_HOURS
-            )
+            return self.rvr_start_date + RVR_SLA_DEADLINE
         return None
     sla_rvr_deadline.fget.short_description = 'Срок устранения РВР'
 
     @property
     def sla_dgu_deadline(self) -> Optional[datetime]:
         if self.dgu_start_date:
-            return self.dgu_start_date + timedelta(
-                hours=DGU_SLA_WAITING_DEADLINE_IN_HOURS
-            )
+            return self.dgu_start_date + DGU_SLA_WAITING_DEADLINE
         return None
     sla_dgu_deadline.fget.short_description = 'Срок устранения ДГУ'
 
     @property
     def sla_eks_deadline(self) -> Optional[datetime]:
         if self.eks_start_date:
-            return self.eks_start_date + timedelta(
-                hours=EKS_SLA_WAITING_DEADLINE_IN_HOURS
-            )
+            return self.eks_start_date + EKS_SLA_WAITING_DEADLINE
         return None
     sla_eks_deadline.fget.short_description = 'Срок устранения ЭКС'
 
@@ -679,22 +658,17 @@ class Incident(models.Model):
         category = category.lower()
 
         # ---------- AVR ----------
+        # Срок считается один раз: свойства is_sla_*_expired повторно
+        # обращались бы к incident_type и пересчитывали его.
         if category == 'avr':
-            start = self.avr_start_date
             end = self.avr_end_date
+            deadline = self.sla_avr_deadline
 
-            if (
-                not start
-                or not self.incident_type
-                or not self.incident_type.sla_deadline
-            ):
+            if deadline is None:
                 return None
 
-            sla_delta = timedelta(minutes=self.incident_type.sla_deadline)
-            deadline = start + sla_delta
-
             if end:
-                if self.is_sla_avr_expired:
+                if deadline < end:
                     return SLAStatus.EXPIRED_CLOSED
                 return SLAStatus.CLOSED_ON_TIME
 
@@ -707,17 +681,14 @@ class Incident(models.Model):
 
         # ---------- RVR ----------
         if category == 'rvr':
-            start = self.rvr_start_date
             end = self.rvr_end_date
+            deadline = self.sla_rvr_deadline
 
-            if not start:
+            if deadline is None:
                 return None
 
-            sla_delta = timedelta(hours=RVR_SLA_DEADLINE_IN_HOURS)
-            deadline = start + sla_delta
-
             if end:
-                if self.is_sla_rvr_expired:
+                if deadline < end:
                     return SLAStatus.EXPIRED_CLOSED
                 return SLAStatus.CLOSED_ON_TIME
 
@@ -739,10 +710,8 @@ class Incident(models.Model):
             end_date = end or now
             elapsed = end_date - start
 
-            in_progress_limit = timedelta(
-                hours=DGU_SLA_IN_PROGRESS_DEADLINE_IN_HOURS
-            )
-            waiting_limit = timedelta(hours=DGU_SLA_WAITING_DEADLINE_IN_HOURS)
+            in_progress_limit = DGU_SLA_IN_PROGRESS_DEADLINE
+            waiting_limit = DGU_SLA_WAITING_DEADLINE
 
             if end:
                 if elapsed > waiting_limit:
@@ -766,10 +735,8 @@ class Incident(models.Model):
             end_date = end or now
             elapsed = end_date - start
 
-            in_progress_limit = timedelta(
-                hours=EKS_SLA_IN_PROGRESS_DEADLINE_IN_HOURS
-            )
-            waiting_limit = timedelta(hours=EKS_SLA_WAITING_DEADLINE_IN_HOURS)
+            in_progress_limit = EKS_SLA_IN_PROGRESS_DEADLINE
+            waiting_limit = EKS_SLA_WAITING_DEADLINE
 
             # Закрыт
             if end:
@@ -919,16 +886,18 @@ class IncidentType(Detail):
         verbose_name = 'тип инцидента'
         verbose_name_plural = 'Типы инцидентов'
         ordering = ['name']
+        constraints = [
+            CheckConstraint(
+                check=Q(sla_deadline__gt=0) | Q(sla_deadline__isnull=True),
+                name='sla_deadline_positive',
+            ),
+        ]
 
     def clean(self):
         super().clean()
         if self.sla_deadline is not None and self.sla_deadline <= 0:
             raise ValidationError('SLA должен быть больше 0')
 
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
-
 
 class StatusType(Detail):
     css_class = models.CharField(
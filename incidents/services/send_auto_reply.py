@@ -55,7 +55,7 @@ class AutoReply:
             and incident.is_incident_finish
             and not incident.is_yt_tracker_controlled
             and (now - email.email_date) <= AUTO_REPLY_MAX_AGE_TTL
-            and email.folder == EmailFolder.get_inbox()
+            and email.folder_id == EmailFolder.get_inbox_id()
         ):
             now = timezone.now()
             message_id = generate_message_id()
@@ -172,7 +172,7 @@ class AutoReply:
 
     def open_incident_or_reply(self, email: EmailMessage, email_login: str):
         incident = email.email_incident
-        is_incoming_email = email.folder == EmailFolder.get_inbox()
+        is_incoming_email = email.folder_id == EmailFolder.get_inbox_id()
 
         if incident:
             # Письма отправляются системой и попадают в папку отличную от
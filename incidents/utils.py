@@ -686,6 +686,7 @@ class IncidentManager(IncidentValidator):
                     email_incident__is_incident_finish=False,
                 )
                 .select_related('email_incident')
+                .only('email_incident')  # Тело письма не нужно
                 .order_by('-email_date', '-id')  # Самые свежие в начале
                 .first()
             )
@@ -704,24 +705,23 @@ class IncidentManager(IncidentValidator):
             if actual_email_incident:
                 selection_strategy = IncidentSelectionStrategy.by_subject_only
 
-        # Поиск опоры и БС по всей переписке:
+        # Поиск опоры и БС по всей переписке (у инцидента с опорой искать
+        # нечего — ниже пустые поля инцидента заполняются только из них):
         if (
             not actual_email_incident
-            or (actual_email_incident and not actual_email_incident.pole)
+            or actual_email_incident.pole_id is None
         ):
             pole, base_station = next(
                 (
-                    self.find_pole_and_base_station_in_msg(msg)
-                    for msg in emails_thread
-                    if (
-                        pole := self.find_pole_and_base_station_in_msg(msg)[0]
-                    ) is not None
+                    found
+                    for found in map(
+                        self.find_pole_and_base_station_in_msg, emails_thread
+                    )
+                    if found[0] is not None
                 ), (None, None)
             )
         else:
-            pole, base_station = (
-                actual_email_incident.pole, actual_email_incident.base_station
-            )
+            pole, base_station = None, None
 
         # Инцидент по переписке к которой относится письмо существует:
         if actual_email_incident:
@@ -730,7 +730,7 @@ class IncidentManager(IncidentValidator):
         # Письмо в переписке не относится ни к одному инциденту, поэтому
         # надо создать новый инцидент (только для входящих писем):
         elif (
-            email_msg.folder == EmailFolder.get_inbox()
+            email_msg.folder_id == EmailFolder.get_inbox_id()
         ):
             # Исключение для Tele2:
             if (
@@ -749,6 +749,8 @@ class IncidentManager(IncidentValidator):
                         email_incident__isnull=False,
                         email_incident__is_incident_finish=False,
                     )
+                    .select_related('email_incident')
+                    .only('email_incident')  # Тело письма не нужно
                     .order_by('-email_date', '-id')  # Самые свежие в начале
                     .first()
                 )
@@ -837,23 +839,26 @@ class IncidentManager(IncidentValidator):
             email_incident__isnull=True
         ).update(email_incident=actual_email_incident)
 
+        update_fields = []
+
         # У инцидента обновляем поле с шифром опоры и БС, если там пусто:
-        if actual_email_incident.pole is None and pole is not None:
+        if actual_email_incident.pole_id is None and pole is not None:
             actual_email_incident.pole = pole
-            actual_email_incident.save(update_fields=['pole'])
+            update_fields.append('pole')
 
-        if actual_email_incident.base_station is None and (
+        if actual_email_incident.base_station_id is None and (
             base_station is not None
         ):
             actual_email_incident.base_station = base_station
-            actual_email_incident.save(update_fields=['base_station'])
+            update_fields.append('base_station')
 
         # У актуального инцидента разблокируем авто привязку:
         if actual_email_incident.disable_thread_auto_link:
             actual_email_incident.disable_thread_auto_link = False
-            actual_email_incident.save(
-                update_fields=['disable_thread_auto_link']
-            )
+            update_fields.append('disable_thread_auto_link')
+
+        if update_fields:
+            actual_email_incident.save(update_fields=update_fields)
 
         # Выставляем у нового инцидента изначальный статус:
         if new_incident:
@@ -1,4 +1,5 @@
 import datetime as dt
+import os
 from pathlib import Path
 
 from django.conf import settings
@@ -8,6 +9,7 @@ from django.utils import timezone
 
 from core.loggers import default_logger
 from core.pretty_print import PrettyPrint
+from core.utils import scandir_recursive
 from core.wraps import timer
 from users.constants import SUBFOLDER_AVATAR_DIR
 
@@ -32,7 +34,8 @@ class Command(BaseCommand):
         """
         Удаляет файлы с диска, если на них нет ссылки в БД и они старше порога.
         """
-        threshold = timezone.now() - self.dt
+        # Сравниваем mtime с порогом как числа, без datetime на каждый файл:
+        threshold_ts = (timezone.now() - self.dt).timestamp()
 
         if not self.avatar_dir.exists():
             default_logger.warning(
@@ -40,37 +43,41 @@ class Command(BaseCommand):
             )
             return
 
-        valid_avatars = set(
+        valid_avatars = frozenset(
             User.objects.exclude(avatar__isnull=True)
             .values_list('avatar', flat=True)
         )
-        all_files = [p for p in self.avatar_dir.rglob('*') if p.is_file()]
+        # Один обход папки: список сразу даёт и файлы, и total.
+        all_files = [
+            entry for entry in scandir_recursive(str(self.avatar_dir))
+            if entry.is_file(follow_symlinks=False)
+        ]
+        # avatar_dir лежит внутри MEDIA_ROOT, поэтому относительный путь —
+        # это хвост entry.path после префикса:
+        media_prefix_len = len(os.path.join(settings.MEDIA_ROOT, ''))
 
         total = len(all_files)
         deleted_count = 0
 
-        for index, file_path in enumerate(all_files):
+        for index, entry in enumerate(all_files):
             PrettyPrint.progress_bar_debug(
                 index, total, 'Проверка аватаров без записи в базе:'
             )
 
-            relative_path = str(file_path.relative_to(settings.MEDIA_ROOT))
+            relative_path = entry.path[media_prefix_len:]
 
             try:
-                mtime = dt.datetime.fromtimestamp(
-                    file_path.stat().st_mtime,
-                    tz=timezone.get_current_timezone()
-                )
+                mtime = entry.stat(follow_symlinks=False).st_mtime
             except OSError:
                 continue
 
-            if relative_path not in valid_avatars and mtime < threshold:
+            if relative_path not in valid_avatars and mtime < threshold_ts:
                 try:
-                    file_path.unlink()
+                    os.unlink(entry.path)
                     deleted_count += 1
                 except OSError:
                     default_logger.warning(
-                        f'Не удалось удалить аватар: {file_path}'
+                        f'Не удалось удалить аватар: {entry.path}'
                     )
 
         if deleted_count:
@@ -150,6 +150,8 @@ class AutoEmailsFromYT:
             .order_by(
                 'email_incident_id', 'email_date', '-is_first_email', 'id'
             )
+            # Нужен только отправитель, тело письма не загружаем:
+            .only('email_from')
         ).first()
         email_to = [] if not first_email else [first_email.email_from]
 
@@ -206,6 +208,8 @@ class AutoEmailsFromYT:
             .order_by(
                 'email_incident_id', 'email_date', '-is_first_email', 'id'
             )
+            # Нужен только отправитель, тело письма не загружаем:
+            .only('email_from')
         ).first()
         email_to = [] if not first_email else [first_email.email_from]
 
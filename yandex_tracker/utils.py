@@ -965,7 +965,7 @@ class YandexTrackerManager:
         if (
             SEND_AUTO_EMAIL_ON_CLOSED_INCIDENT
             and incident.is_incident_finish
-            and email_incident.folder == EmailFolder.get_inbox()
+            and email_incident.folder_id == EmailFolder.get_inbox_id()
         ):
             from emails.email_parser import email_parser  # noqa: I001
 
@@ -1048,9 +1048,16 @@ class YandexTrackerManager:
         # Инцидент отсутствует в YandexTracker, но по нему пришло уточнение,
         # поэтому надо восстановить полностью цепочку писем для инцидента:
         elif not issues and not is_first_email:
+            # Вложения и получатели всей цепочки загружаются заранее, а не
+            # отдельными запросами на каждое письмо:
             all_email_incident = EmailMessage.objects.filter(
                 email_incident=email_incident.email_incident
-            ).order_by('email_date', '-is_first_email', 'id')
+            ).order_by('email_date', '-is_first_email', 'id').prefetch_related(
+                'email_attachments',
+                'email_intext_attachments',
+                'email_msg_to',
+                'email_msg_cc',
+            )
 
             first_email_incident = all_email_incident.first()
             new_data_for_yt = self._prepare_data_from_email(